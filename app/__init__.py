@@ -1,5 +1,6 @@
 from flask import Flask
 from app.extensions import db, bcrypt, login_manager, migrate, cache
+from app.caching import cache_config
 from app.models import User, Game
 from app.routes import register_blueprints
 from app.utils import placeholder_url, first_cap, get_thumbnail_url
@@ -10,7 +11,13 @@ from flask_compress import Compress
 load_dotenv()
 
 
-def create_app():
+def create_app(require_model: bool = True):
+    """
+    `require_model` opens the recommender model now, so a missing, corrupt or
+    mismatched artifact fails boot (each gunicorn worker) instead of the first
+    recommendation request. Scripts and the trainer, which run before a model
+    exists or do not serve recommendations, pass False.
+    """
     app = Flask(
         __name__,
         template_folder=os.path.join(os.path.dirname(__file__), "templates"),
@@ -27,7 +34,7 @@ def create_app():
     bcrypt.init_app(app)
     login_manager.init_app(app)
     migrate.init_app(app, db)
-    cache.init_app(app)
+    cache.init_app(app, config=cache_config())
 
     login_manager.login_view = "auth.login"
 
@@ -46,4 +53,17 @@ def create_app():
         return {"thumbnail_url": get_thumbnail_url}
 
     register_blueprints(app)
+
+    from app.recommender.click_log import click_log
+    click_log.init_app(app)
+
+    if require_model:
+        from app.recommender.recommender import get_model
+        get_model()  # raises ModelArtifactError
+
+    # Load game details into this worker's store now instead of on the first request.
+    if os.getenv("WARM_GAME_STORE") == "1":
+        from app.recommender.game_store import game_store
+        with app.app_context():
+            game_store.warm()
     return app
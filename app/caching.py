@@ -0,0 +1,91 @@
+# caching.py
+"""
+Cache layer shared by every gunicorn worker on a host.
+
+The backend is Flask-Caching's, chosen from the environment:
+
+    CACHE_TYPE=FileSystemCache  (default) files under CACHE_DIR, shared by all workers
+    CACHE_TYPE=RedisCache       shared across hosts, needs `redis` and CACHE_REDIS_URL
+    CACHE_TYPE=SimpleCache      per-process memory (tests / single worker)
+
+CACHE_THRESHOLD bounds the number of entries; past it the backend evicts
+expired and then oldest entries. Callers go through `cache_get`/`cache_set`
+with a namespace, and `invalidate` drops one key or a whole namespace in O(1)
+by bumping the namespace generation that is part of every key.
+"""
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from app.extensions import cache
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "gamerecommender-cache")
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def cache_config() -> dict:
+    """Flask-Caching config from the environment (see module docstring)."""
+    cache_type = os.getenv("CACHE_TYPE", "FileSystemCache")
+    config = {
+        "CACHE_TYPE": cache_type,
+        "CACHE_DEFAULT_TIMEOUT": int(os.getenv("CACHE_DEFAULT_TIMEOUT", 600)),
+        "CACHE_THRESHOLD": int(os.getenv("CACHE_THRESHOLD", 5000)),
+        "CACHE_KEY_PREFIX": os.getenv("CACHE_KEY_PREFIX", "gr:"),
+    }
+    if cache_type == "FileSystemCache":
+        config["CACHE_DIR"] = os.getenv("CACHE_DIR", DEFAULT_CACHE_DIR)
+    elif cache_type == "RedisCache":
+        config["CACHE_REDIS_URL"] = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    return config
+
+
+def _count(namespace: str, outcome: str):
+    with _stats_lock:
+        _stats[(namespace, outcome)] += 1
+
+
+def _generation(namespace: str) -> int:
+    gen = cache.get(f"{namespace}:gen")
+    if gen is None:
+        # First use, or the backend evicted the counter: start a fresh generation
+        # (never reuse an old one, its entries may be stale). `add` keeps a
+        # concurrent worker's value if it got there first.
+        cache.add(f"{namespace}:gen", time.time_ns(), timeout=0)
+        gen = cache.get(f"{namespace}:gen")
+    return gen
+
+
+def _key(namespace: str, key) -> str:
+    return f"{namespace}:{_generation(namespace)}:{key}"
+
+
+def cache_get(namespace: str, key):
+    value = cache.get(_key(namespace, key))
+    _count(namespace, "hits" if value is not None else "misses")
+    return value
+
+
+def cache_set(namespace: str, key, value, timeout: int | None = None):
+    cache.set(_key(namespace, key), value, timeout=timeout)
+
+
+def invalidate(namespace: str, key=None):
+    """Drop one cached `key`, or every key of `namespace` when `key` is None."""
+    if key is not None:
+        cache.delete(_key(namespace, key))
+        return
+    # Old-generation entries become unreachable and age out under the threshold.
+    cache.set(f"{namespace}:gen", time.time_ns(), timeout=0)
+
+
+def cache_stats() -> dict:
+    """Hit/miss counters of this process, per namespace."""
+    with _stats_lock:
+        out = {}
+        for (namespace, outcome), n in _stats.items():
+            out.setdefault(namespace, {"hits": 0, "misses": 0})[outcome] = n
+        return out
@@ -10,7 +10,7 @@ db = SQLAlchemy()
 bcrypt = Bcrypt()
 login_manager = LoginManager()
 migrate = Migrate()
-cache = Cache(config={"CACHE_TYPE": "SimpleCache"})
+cache = Cache()  # backend configured in create_app, see app/caching.py
 
 login_manager.login_view = "auth.login"
 login_manager.login_message_category = "info"
\ No newline at end of file
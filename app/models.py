@@ -1,5 +1,4 @@
 from sqlalchemy.dialects.postgresql import JSON
-from sqlalchemy.types import PickleType
 from datetime import datetime
 from app import db
 from flask_login import UserMixin
@@ -8,7 +7,9 @@ playlist_games = db.Table(
     "playlist_games",
     db.Column("playlist_id", db.Integer, db.ForeignKey("to_play_list.id"), primary_key=True),
     db.Column("game_id", db.Integer, db.ForeignKey("game.id"), primary_key=True),
-    db.Column("position", db.Integer, nullable=False, default=0)
+    db.Column("position", db.Integer, nullable=False, default=0),
+    # the custom-order read in playlist.view: WHERE playlist_id = ? ORDER BY position
+    db.Index("ix_playlist_games_playlist_id_position", "playlist_id", "position"),
 )
 
 
@@ -39,7 +40,7 @@ class Game(db.Model):
     background_image = db.Column(db.String)
     screenshots = db.Column(JSON, nullable=True)
     playtime = db.Column(db.Float)
-    last_updated = db.Column(db.DateTime, default=datetime.now(), onupdate=datetime.now())
+    last_updated = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
     accent_color = db.Column(db.String(20))
 
     def to_dict(self):
@@ -57,7 +58,7 @@ class Game(db.Model):
             "playtime": self.playtime,
             "last_updated": self.last_updated,
             "accent_color": self.accent_color,
-            "screenshots": eval(str(self.screenshots))
+            "screenshots": self.screenshots,  # native JSON array, see migration 7c4e2a9d1f35
         }
 
     def __repr__(self):
@@ -73,11 +74,50 @@ class User(UserMixin, db.Model):
     role = db.Column(db.String(20), default="user")
     profile_pic = db.Column(db.String(200), default="images/pfp.png")  # path in static
 
-    clicked = db.Column(JSON, default=list)  # store game IDs
-    played = db.Column(JSON, default=list)
-    ratings = db.Column(PickleType, default=dict)
+    # clicks, played games and ratings live in user_interaction / user_rating
+    # (see app/recommender/interactions.py); bumped whenever they change, keys
+    # the per-user feed cache
+    feed_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     playlists = db.relationship("ToPlayList", backref="user", lazy=True)
 
     def __repr__(self):
         return f"<User {self.username}>, Role {self.role}   "
+
+
+class UserInteraction(db.Model):
+    """
+    Append-only log of a user's clicks and played toggles, one row per event.
+    The played state of a game is its latest "played"/"unplayed" event.
+    """
+    __tablename__ = "user_interaction"
+
+    CLICK, PLAYED, UNPLAYED = "click", "played", "unplayed"
+
+    id = db.Column(db.Integer, primary_key=True)  # insertion order, newest = highest
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    game_id = db.Column(db.Integer, nullable=False)
+    kind = db.Column(db.String(16), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    __table_args__ = (
+        # recent events of one user and kind: WHERE user_id = ? AND kind = ? ORDER BY id DESC
+        db.Index("ix_user_interaction_user_kind_id", "user_id", "kind", "id"),
+        # one user's events on one game, and every user's events on a game
+        db.Index("ix_user_interaction_game_user", "game_id", "user_id"),
+    )
+
+
+class UserRating(db.Model):
+    """Append-only log of ratings; a user's rating of a game is the newest row."""
+    __tablename__ = "user_rating"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    game_id = db.Column(db.Integer, nullable=False)
+    rating = db.Column(db.SmallInteger, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    __table_args__ = (
+        db.Index("ix_user_rating_user_game_id", "user_id", "game_id", "id"),
+    )
@@ -4,7 +4,12 @@ from .recommender import (
     recommend_similar_games,
     get_diverse_feed,
     get_game_detail,
-    extract_franchise_key
+    get_game_details,
+    prime_game_details,
+)
+
+from .franchise import (
+    extract_franchise_key,
 )
 
 from .playlist import (
@@ -16,6 +21,8 @@ __all__ = [
     "recommend_similar_games",
     "get_diverse_feed",
     "get_game_detail",
+    "get_game_details",
+    "prime_game_details",
     "extract_franchise_key",
     "optimize_play_order",
 ]
@@ -0,0 +1,169 @@
+# ann.py
+"""
+Approximate nearest neighbours over the unit-length game embeddings.
+
+An inverted-file (IVF) index: the embeddings are partitioned into `n_lists`
+clusters, and each cluster's rows are stored contiguously. A query ranks the
+list centroids and only scores the rows of the `nprobe` closest lists, so it
+touches about nprobe / n_lists of the catalog instead of all of it; `nprobe`
+is the recall/latency knob (see scripts/bench_ann.py for recall@K).
+
+The index lives in `<model dir>/ivf/` next to the model arrays, in the same
+format (.npy files + manifest.json) and is memory-mapped the same way. Full
+training only builds it for catalogs past ANN_MIN_GAMES, the only ones that
+are served through it.
+"""
+import json
+import os
+
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+
+from app.recommender.artifact import ModelArtifactError, _write_npy
+from app.recommender.ranking import _top_k
+
+IVF_DIR = "ivf"
+IVF_FORMAT_VERSION = 1
+NPROBE = int(os.getenv("ANN_NPROBE", 8))
+GRAPH_NPROBE = 16  # lists probed per list when building all top-K lists at training time
+# Catalogs larger than this build their neighbour lists and serve exact-scan
+# fallbacks through the index; smaller ones stay exact.
+ANN_MIN_GAMES = int(os.getenv("ANN_MIN_GAMES", 50000))
+
+
+def _nearest_list(embeddings: np.ndarray, centroids: np.ndarray, block_size: int = 8192) -> np.ndarray:
+    """Closest centroid of every row, block by block (N x n_lists never materializes)."""
+    out = np.empty(len(embeddings), dtype=np.int32)
+    for start in range(0, len(embeddings), block_size):
+        out[start:start + block_size] = (embeddings[start:start + block_size] @ centroids.T).argmax(axis=1)
+    return out
+
+
+class IVFIndex:
+    def __init__(self, centroids: np.ndarray, assign: np.ndarray, rows: np.ndarray, offsets: np.ndarray):
+        self.centroids = centroids  # float32 [n_lists, dim], unit length
+        self.assign = assign        # int32 [N] list of every row
+        self.rows = rows            # int32 [N] rows grouped by list
+        self.offsets = offsets      # int64 [n_lists + 1] list l is rows[offsets[l]:offsets[l + 1]]
+
+    def __len__(self):
+        return len(self.assign)
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    def __repr__(self):
+        return f"<IVFIndex n={len(self)} lists={self.n_lists}>"
+
+    # ---- build ----
+    @classmethod
+    def from_assignments(cls, centroids: np.ndarray, assign: np.ndarray) -> "IVFIndex":
+        assign = np.asarray(assign, dtype=np.int32)
+        rows = np.argsort(assign, kind="stable").astype(np.int32)
+        offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assign, minlength=len(centroids)), out=offsets[1:])
+        return cls(np.asarray(centroids, dtype=np.float32), assign, rows, offsets)
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray, n_lists: int | None = None, seed: int = 42) -> "IVFIndex":
+        """Partition `embeddings` into n_lists (default ~4 sqrt(N)) lists with MiniBatchKMeans."""
+        n = len(embeddings)
+        n_lists = min(n_lists or max(int(4 * np.sqrt(n)), 1), n)
+        km = MiniBatchKMeans(n_clusters=n_lists, random_state=seed, n_init=1, batch_size=max(4096, 2 * n_lists))
+        km.fit(embeddings)
+        centroids = km.cluster_centers_.astype(np.float32)
+        centroids /= np.linalg.norm(centroids, axis=1, keepdims=True) + 1e-12
+        return cls.from_assignments(centroids, _nearest_list(embeddings, centroids))
+
+    def reassign(self, embeddings: np.ndarray, rows) -> "IVFIndex":
+        """Index for a catalog where `rows` of `embeddings` were added or changed (centroids frozen)."""
+        rows = np.asarray(rows, dtype=np.int64)
+        assign = np.empty(len(embeddings), dtype=np.int32)
+        assign[:len(self.assign)] = self.assign
+        if len(rows):
+            assign[rows] = _nearest_list(embeddings[rows], self.centroids)
+        return IVFIndex.from_assignments(self.centroids, assign)
+
+    # ---- query ----
+    def probe(self, query: np.ndarray, nprobe: int = NPROBE, min_rows: int = 0) -> np.ndarray:
+        """
+        The `nprobe` lists whose centroids are closest to `query`, plus further
+        lists in the same order until they hold at least `min_rows` rows.
+        """
+        order = np.argsort(-(self.centroids @ query))
+        need = int(np.searchsorted(np.cumsum(np.diff(self.offsets)[order]), min_rows)) + 1
+        return order[:max(nprobe, need)]
+
+    def candidates(self, query: np.ndarray, nprobe: int = NPROBE, min_rows: int = 0) -> np.ndarray:
+        """Rows stored in the probed lists of `query`."""
+        lists = self.probe(query, nprobe, min_rows)
+        return np.concatenate([self.rows[self.offsets[l]:self.offsets[l + 1]] for l in lists])
+
+    def query(self, embeddings: np.ndarray, query: np.ndarray, k: int, nprobe: int = NPROBE):
+        """Approximate top-k rows of `embeddings` by cosine to `query`; (rows, scores), best first."""
+        cand = self.candidates(query, nprobe, min_rows=k)
+        sims = embeddings[cand] @ query
+        k = min(k, len(cand))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        head = np.argpartition(-sims, k - 1)[:k]
+        head = head[np.argsort(-sims[head], kind="stable")]
+        return cand[head].astype(np.int64), sims[head]
+
+    # ---- storage ----
+    def save(self, model_path: str):
+        path = os.path.join(model_path, IVF_DIR)
+        os.makedirs(path, exist_ok=True)
+        arrays = {"centroids": self.centroids, "assign": self.assign, "rows": self.rows, "offsets": self.offsets}
+        for name, arr in arrays.items():
+            _write_npy(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(arr))
+        manifest = {"format_version": IVF_FORMAT_VERSION, "n_rows": len(self), "n_lists": self.n_lists}
+        tmp = os.path.join(path, f"manifest.json.tmp-{os.getpid()}")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, os.path.join(path, "manifest.json"))
+
+    @classmethod
+    def load(cls, model_path: str, mmap_mode: str | None = "r") -> "IVFIndex":
+        path = os.path.join(model_path, IVF_DIR)
+        try:
+            with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            raise ModelArtifactError(f"no ANN index at {path}; retrain the model") from None
+        if manifest.get("format_version") != IVF_FORMAT_VERSION:
+            raise ModelArtifactError(f"ANN index at {path} has format version {manifest.get('format_version')}")
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+            for name in ("centroids", "assign", "rows", "offsets")
+        }
+        index = cls(**arrays)
+        if len(index) != manifest["n_rows"] or index.n_lists != manifest["n_lists"]:
+            raise ModelArtifactError(f"ANN index at {path} does not match its manifest")
+        return index
+
+
+def ivf_neighbor_index(embeddings: np.ndarray, index: IVFIndex, k: int, nprobe: int = GRAPH_NPROBE):
+    """
+    Approximate top-k neighbour lists for every row, like `ml.build_neighbor_index`
+    but each list only compares against the rows of the `nprobe` lists closest
+    to its own centroid: O(N x nprobe x N / n_lists) instead of O(N²).
+    """
+    n = len(embeddings)
+    k = min(k, n)
+    indices = np.empty((n, k), dtype=np.int32)
+    scores = np.zeros((n, k), dtype=np.float32)
+    for l in range(index.n_lists):
+        members = index.rows[index.offsets[l]:index.offsets[l + 1]]
+        if not len(members):
+            continue
+        cand = index.candidates(index.centroids[l], nprobe)
+        sims = embeddings[members] @ embeddings[cand].T
+        kk = min(k, len(cand))
+        indices[members, :kk], scores[members, :kk] = _top_k(sims, kk, np.broadcast_to(cand, sims.shape))
+        if kk < k:
+            # Probed lists hold fewer than k rows: pad with self at score 0, which
+            # similar-game lookups drop and neighbour scatters add nothing for.
+            indices[members, kk:] = members[:, None]
+    return indices, scores
@@ -0,0 +1,237 @@
+# artifact.py
+"""
+Versioned on-disk model format shared by the trainer (ml.py) and the web app.
+
+A model is a directory with one `.npy` file per array plus `manifest.json`.
+Workers open every array with `numpy.load(mmap_mode="r")`, so the pages sit in
+the OS page cache once and are shared by all gunicorn processes instead of
+being unpickled into private memory by each of them.
+
+Text columns are stored as one UTF-8 byte buffer plus row offsets
+(`<col>.data.npy`, `<col>.offsets.npy`), so a single long value costs only its
+own bytes instead of widening a fixed-width unicode array for every row.
+
+The fitted sklearn transformers are only needed for (re)training, so they are
+pickled separately in `transformers.pkl` and never loaded by the web workers.
+"""
+import json
+import os
+import pickle
+from datetime import datetime
+
+import numpy as np
+
+FORMAT_VERSION = 3
+MANIFEST_FILE = "manifest.json"
+TRANSFORMERS_FILE = "transformers.pkl"
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.getenv("MODEL_DIR", os.path.join(BASE_PATH, "..", "data", "model"))
+
+# Arrays every artifact must provide, with the number of dimensions expected.
+REQUIRED_ARRAYS = {
+    "ids": 1,              # int64 game id per row
+    "id_order": 1,         # argsort of ids → binary search id → row
+    "cluster": 1,          # int32 KMeans label per row
+    "franchise": 1,        # int32 code of the row's franchise key
+    "rating": 1,           # float32, missing values filled with the mean
+    "metacritic": 1,       # float32, missing values filled with the mean
+    "embeddings": 2,       # float32 [N, dim], L2-normalized X_combined
+    "neighbor_idx": 2,     # int32 [N, K] top-K neighbours, best first
+    "neighbor_scores": 2,  # float32 [N, K] cosine scores for neighbor_idx
+}
+
+# Text columns exported as TextColumns (mmap-able, no pickle).
+TEXT_COLUMNS = ("name", "slug", "genres", "tags", "released", "background_image")
+
+
+class ModelArtifactError(RuntimeError):
+    """Raised when a model directory is missing, incomplete or of another format."""
+
+
+class TextColumn:
+    """
+    Strings of one column as UTF-8 bytes plus row offsets: row i is
+    data[offsets[i]:offsets[i + 1]]. Both arrays can be memory-mapped.
+    """
+
+    def __init__(self, offsets: np.ndarray, data: np.ndarray):
+        self.offsets = offsets  # int64 [N + 1]
+        self.data = data        # uint8 [total bytes]
+
+    @classmethod
+    def from_values(cls, values) -> "TextColumn":
+        """Column of strings (None/NaN → "")."""
+        encoded = [("" if v is None or v != v else str(v)).encode("utf-8") for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8))
+
+    @classmethod
+    def concat(cls, parts: list["TextColumn"]) -> "TextColumn":
+        """One column of the rows of `parts`, in order."""
+        offsets = [np.zeros(1, dtype=np.int64)]
+        base = 0
+        for part in parts:
+            offsets.append(np.asarray(part.offsets[1:], dtype=np.int64) + base)
+            base += int(part.offsets[-1])
+        data = [np.asarray(part.data, dtype=np.uint8) for part in parts]
+        return cls(np.concatenate(offsets), np.concatenate(data) if data else np.empty(0, dtype=np.uint8))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> str:
+        return bytes(self.data[self.offsets[row]:self.offsets[row + 1]]).decode("utf-8")
+
+    def take(self, rows) -> list[str]:
+        starts, stops = self.offsets[:-1], self.offsets[1:]
+        return [bytes(self.data[starts[r]:stops[r]]).decode("utf-8") for r in np.asarray(rows).tolist()]
+
+    def tolist(self) -> list[str]:
+        return self.take(np.arange(len(self)))
+
+
+class ModelArtifact:
+    """Read-only view of a model directory; arrays and text columns are exposed as attributes."""
+
+    def __init__(self, path: str, manifest: dict, arrays: dict[str, np.ndarray], text: dict | None = None):
+        self.path = path
+        self.manifest = manifest
+        self.arrays = arrays
+        self.text: dict[str, TextColumn] = text or {}
+
+    def __getattr__(self, name):
+        for store in ("arrays", "text"):
+            if name in self.__dict__.get(store, {}):
+                return self.__dict__[store][name]
+        raise AttributeError(name)
+
+    def __len__(self):
+        return int(self.manifest["n_games"])
+
+    def __repr__(self):
+        return f"<ModelArtifact v{self.manifest['format_version']} n={len(self)} at {self.path}>"
+
+
+def _write_npy(path: str, arr: np.ndarray):
+    # Write next to the target and rename, so workers that still have the old
+    # file mapped keep reading the old inode instead of a truncated one.
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "wb") as f:
+        np.save(f, arr, allow_pickle=False)
+    os.replace(tmp, path)
+
+
+def save_model(
+    arrays: dict[str, np.ndarray],
+    transformers: dict | None = None,
+    path: str = MODEL_DIR,
+    training: dict | None = None,
+) -> dict:
+    """
+    Write `arrays` (and optionally the fitted transformers) as a model directory.
+    Values of `arrays` that are TextColumns are written as offsets + bytes.
+    `training` is free-form JSON bookkeeping of the trainer (watermark, drift counters).
+    """
+    missing = set(REQUIRED_ARRAYS) - set(arrays)
+    if missing:
+        raise ModelArtifactError(f"cannot save model, missing arrays: {sorted(missing)}")
+
+    os.makedirs(path, exist_ok=True)
+    n_games = len(arrays["ids"])
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "n_games": n_games,
+        "dim": int(arrays["embeddings"].shape[1]),
+        "k": int(arrays["neighbor_idx"].shape[1]),
+        "arrays": {},
+        "text": {},
+    }
+    if training is not None:
+        manifest["training"] = training
+    for name, arr in arrays.items():
+        if isinstance(arr, TextColumn):
+            if len(arr) != n_games:
+                raise ModelArtifactError(f"text column {name!r} has {len(arr)} rows, expected {n_games}")
+            _write_npy(os.path.join(path, f"{name}.offsets.npy"), np.ascontiguousarray(arr.offsets, dtype=np.int64))
+            _write_npy(os.path.join(path, f"{name}.data.npy"), np.ascontiguousarray(arr.data, dtype=np.uint8))
+            manifest["text"][name] = {"n_bytes": int(arr.offsets[-1])}
+            continue
+        arr = np.ascontiguousarray(arr)
+        if arr.shape[0] != n_games:
+            raise ModelArtifactError(f"array {name!r} has {arr.shape[0]} rows, expected {n_games}")
+        _write_npy(os.path.join(path, f"{name}.npy"), arr)
+        manifest["arrays"][name] = {"dtype": arr.dtype.str, "shape": list(arr.shape)}
+
+    if transformers is not None:
+        tmp = os.path.join(path, f"{TRANSFORMERS_FILE}.tmp-{os.getpid()}")
+        with open(tmp, "wb") as f:
+            pickle.dump(transformers, f)
+        os.replace(tmp, os.path.join(path, TRANSFORMERS_FILE))
+
+    # Manifest goes last: a reader only trusts arrays the manifest describes.
+    tmp = os.path.join(path, f"{MANIFEST_FILE}.tmp-{os.getpid()}")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(path, MANIFEST_FILE))
+    return manifest
+
+
+def read_manifest(path: str = MODEL_DIR) -> dict:
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise ModelArtifactError(f"no model at {path} (missing {MANIFEST_FILE}); run `python -m app.recommender.ml`")
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    version = manifest.get("format_version")
+    if version != FORMAT_VERSION:
+        raise ModelArtifactError(
+            f"model at {path} has format version {version}, this code reads version {FORMAT_VERSION}; retrain the model"
+        )
+    return manifest
+
+
+def load_model(path: str = MODEL_DIR, mmap_mode: str | None = "r") -> ModelArtifact:
+    """Open a model directory, checking every array against the manifest before use."""
+    manifest = read_manifest(path)
+    n_games = manifest["n_games"]
+    described = manifest.get("arrays", {})
+
+    missing = set(REQUIRED_ARRAYS) - set(described)
+    if missing:
+        raise ModelArtifactError(f"model at {path} is missing arrays: {sorted(missing)}")
+
+    arrays = {}
+    for name, spec in described.items():
+        file_path = os.path.join(path, f"{name}.npy")
+        if not os.path.exists(file_path):
+            raise ModelArtifactError(f"model at {path} is missing {name}.npy")
+        arr = np.load(file_path, mmap_mode=mmap_mode, allow_pickle=False)
+        if arr.dtype.str != spec["dtype"] or list(arr.shape) != spec["shape"]:
+            raise ModelArtifactError(
+                f"{name}.npy is {arr.dtype.str}{list(arr.shape)}, manifest says {spec['dtype']}{spec['shape']}"
+            )
+        if arr.shape[0] != n_games or (name in REQUIRED_ARRAYS and arr.ndim != REQUIRED_ARRAYS[name]):
+            raise ModelArtifactError(f"{name}.npy does not match a catalog of {n_games} games")
+        arrays[name] = arr
+
+    text = {}
+    for name, spec in manifest.get("text", {}).items():
+        try:
+            offsets = np.load(os.path.join(path, f"{name}.offsets.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+            data = np.load(os.path.join(path, f"{name}.data.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+        except FileNotFoundError:
+            raise ModelArtifactError(f"model at {path} is missing text column {name!r}") from None
+        if offsets.shape != (n_games + 1,) or len(data) != spec["n_bytes"] or int(offsets[-1]) != len(data):
+            raise ModelArtifactError(f"text column {name!r} does not match a catalog of {n_games} games")
+        text[name] = TextColumn(offsets, data)
+
+    return ModelArtifact(path, manifest, arrays, text)
+
+
+def load_transformers(path: str = MODEL_DIR) -> dict:
+    """Fitted vectorizer/svd/normalizer/scaler/kmeans saved alongside the arrays."""
+    with open(os.path.join(path, TRANSFORMERS_FILE), "rb") as f:
+        return pickle.load(f)
@@ -0,0 +1,155 @@
+# click_log.py
+"""
+Write-behind logging of game page clicks.
+
+`game_detail` used to commit a click (and a feed_version bump) before
+rendering. Now it only puts (user, game, time) on a bounded in-process queue;
+a background thread writes what has accumulated every `flush_interval`
+seconds (or as soon as `batch_size` clicks are waiting) with one multi-row
+INSERT, and bumps feed_version once for every user in the batch (a repeat
+click reorders the profile too). A full queue drops the click and counts it
+under "dropped" instead of blocking the request. The queue is drained when the
+worker exits.
+
+Clicks reach the feed up to `flush_interval` seconds later; the per-user
+feed cache is keyed on feed_version, so the bump alone retires old entries.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from app import db
+from app.models import User
+from app.recommender.interactions import record_clicks
+
+
+class ClickLog:
+    def __init__(self, max_pending: int = 10000, batch_size: int = 500, flush_interval: float = 1.0):
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._app = None
+        self._queue = None
+        self._thread = None
+        self._pid = None  # the writer thread belongs to the process that started it
+        self._start_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._stats = Counter()
+        self._stats_lock = threading.Lock()
+
+    def init_app(self, app):
+        self._app = app
+
+    def _count(self, key: str, n: int = 1):
+        with self._stats_lock:
+            self._stats[key] += n
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # First click of this process (gunicorn forks after create_app):
+            # fresh queue and writer thread, drained at exit.
+            self._queue = queue.Queue(maxsize=self.max_pending)
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="click-log", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+            atexit.register(self.close)
+
+    # ---- request side ----
+    def record(self, user_id: int, game_id: int) -> bool:
+        """Queue a click; False when the queue is full and the click was dropped."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((user_id, game_id, datetime.now()))
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("queued")
+        return True
+
+    # ---- writer side ----
+    def _take(self, timeout: float | None) -> list:
+        """Up to batch_size queued clicks; waits at most `timeout` for the first one."""
+        try:
+            batch = [self._queue.get(timeout=timeout) if timeout else self._queue.get_nowait()]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            batch = self._take(self.flush_interval)
+            if not batch:
+                continue
+            if len(batch) < self.batch_size:
+                # let a trickle accumulate into one INSERT per interval
+                self._stop.wait(max(0.0, self.flush_interval - (time.monotonic() - started)))
+                batch += self._take(None)
+            self._write(batch)
+
+    def _write(self, batch: list):
+        with self._write_lock, self._app.app_context():
+            try:
+                clicked = record_clicks(batch)
+                if clicked:
+                    db.session.execute(
+                        User.__table__.update()
+                        .where(User.id.in_(clicked))
+                        .values(feed_version=User.feed_version + 1)
+                    )
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                self._count("failed", len(batch))
+                self._app.logger.exception("click log: dropped a batch of %d clicks", len(batch))
+                return
+            finally:
+                db.session.remove()
+        self._count("written", len(batch))
+
+    def flush(self) -> int:
+        """Write every queued click now, in the calling thread; returns how many."""
+        if self._pid != os.getpid():
+            return 0
+        written = 0
+        while batch := self._take(None):
+            self._write(batch)
+            written += len(batch)
+        return written
+
+    def close(self):
+        """Stop the writer thread and write what is still queued (runs at exit)."""
+        if self._pid != os.getpid():
+            return
+        self._stop.set()
+        self._thread.join(timeout=max(5.0, 2 * self.flush_interval))
+        self.flush()
+
+    def stats(self) -> dict:
+        """queued / written / dropped / failed counters of this process, plus the current backlog."""
+        with self._stats_lock:
+            out = dict(self._stats)
+        out["pending"] = self._queue.qsize() if self._pid == os.getpid() else 0
+        return out
+
+
+click_log = ClickLog(
+    max_pending=int(os.getenv("CLICK_LOG_MAX_PENDING", 10000)),
+    batch_size=int(os.getenv("CLICK_LOG_BATCH_SIZE", 500)),
+    flush_interval=float(os.getenv("CLICK_LOG_FLUSH_INTERVAL", 1.0)),
+)
@@ -0,0 +1,28 @@
+# franchise.py
+import re
+import numpy as np
+
+
+def _norm_text(s: str) -> str:
+    return re.sub(r"[^a-z0-9\s-]", "", (s or "").lower()).strip()
+
+def extract_franchise_key(name: str, slug: str) -> str:
+    s = (slug or _norm_text(name or ""))
+    s = re.sub(r"-(remastered|definitive|complete|goty|ultimate|hd|vr|redux)$", "", s)
+    s = re.sub(r"-(\d+|[ivx]+)$", "", s)
+    s = re.sub(r"-{2,}", "-", s).strip("-")
+    if not s:
+        tokens = _norm_text(name).split()
+        s = "-".join(tokens[:3])
+    return s
+
+def franchise_codes(names, slugs) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Integer-code every game's franchise key once, at model build time.
+    Returns (codes int32 per game, unique keys) so that keys[codes[i]] is game i's key.
+    """
+    keys = [extract_franchise_key(str(n), str(s)) for n, s in zip(names, slugs)]
+    if not keys:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=str)
+    uniq, codes = np.unique(np.array(keys, dtype=str), return_inverse=True)
+    return codes.astype(np.int32), uniq
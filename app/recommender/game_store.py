@@ -0,0 +1,98 @@
+# game_store.py
+"""
+Process-wide read-through store of game details.
+
+Every recommendation response used to run `Game.query.filter(Game.id.in_(...))`
+and `to_dict()` on each row. The catalog rarely changes, so each worker keeps
+one compact record per game, loaded on first use, and pulls only rows whose
+`last_updated` moved past its watermark, at most once per `refresh_interval`
+seconds. In the steady state a feed or similar-games response makes no DB
+round-trip at all; ids the store has never seen fall through to the DB.
+"""
+import os
+import threading
+import time
+
+from app.models import Game
+
+FIELDS = (
+    "id", "name", "slug", "background_image", "description", "genres", "tags",
+    "released", "metacritic", "rating", "playtime", "last_updated", "accent_color",
+    "screenshots",
+)
+
+
+class GameRecord:
+    """Serialized `Game` row; __slots__ keeps a 100k-game catalog small."""
+    __slots__ = FIELDS
+
+    def __init__(self, data: dict):
+        for field in FIELDS:
+            setattr(self, field, data.get(field))
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in FIELDS}
+
+
+class GameStore:
+    def __init__(self, refresh_interval: float = 60, chunk_size: int = 1000):
+        self.refresh_interval = refresh_interval
+        self.chunk_size = chunk_size
+        self._records: dict[int, GameRecord] = {}
+        self._watermark = None  # newest last_updated seen
+        self._checked_at = None  # monotonic time of the last DB check
+        self._lock = threading.Lock()
+
+    def _load(self, query):
+        """Read `query` into the store; the caller holds self._lock."""
+        count = 0
+        for game in query.yield_per(self.chunk_size):
+            self._records[game.id] = GameRecord(game.to_dict())
+            if game.last_updated and (self._watermark is None or game.last_updated > self._watermark):
+                self._watermark = game.last_updated
+            count += 1
+        return count
+
+    def _warm(self) -> int:
+        count = self._load(Game.query.order_by(Game.id))
+        self._checked_at = time.monotonic()  # only once loaded, so waiting threads see a full store
+        return count
+
+    def warm(self) -> int:
+        """Load every game; returns the number of records."""
+        with self._lock:
+            return self._warm()
+
+    def refresh(self, force=False) -> int:
+        """Pull games updated since the watermark; no-op until the interval has passed."""
+        if self._checked_at is None:
+            with self._lock:
+                # concurrent first requests: one thread loads, the rest wait and find it done
+                return self._warm() if self._checked_at is None else 0
+        if not force and time.monotonic() - self._checked_at < self.refresh_interval:
+            return 0
+        if not self._lock.acquire(blocking=force):
+            return 0  # another thread is refreshing; serve the current records meanwhile
+        try:
+            if not force and time.monotonic() - self._checked_at < self.refresh_interval:
+                return 0
+            self._checked_at = time.monotonic()
+            query = Game.query
+            if self._watermark is not None:
+                # >= so rows sharing the watermark timestamp are not missed; re-reading them is harmless
+                query = query.filter(Game.last_updated >= self._watermark)
+            return self._load(query)
+        finally:
+            self._lock.release()
+
+    def get_many(self, game_ids) -> dict[int, dict]:
+        """Details for the ids the store knows; unknown ids are simply absent."""
+        self.refresh()
+        records = self._records
+        return {gid: records[gid].to_dict() for gid in game_ids if gid in records}
+
+    def __len__(self):
+        return len(self._records)
+
+
+game_store = GameStore(refresh_interval=float(os.getenv("GAME_STORE_REFRESH", 60)))
@@ -0,0 +1,146 @@
+# interactions.py
+"""
+User signals (clicks, played games, ratings) from the append-only
+`user_interaction` and `user_rating` tables.
+
+Every click, played toggle or rating is one INSERT (clicks arrive in batches
+from app/recommender/click_log.py), where the old JSON/pickle columns on
+`user` were rewritten whole on each change. Readers never load a
+user's full history: `load_profiles` pulls only the newest `max_clicks` click
+events per user (older clicks no longer move the profile, see PROFILE_WINDOW)
+plus the current played/rating state per game, for one user or many at once.
+Writers do not commit; callers commit together with their feed_version bump.
+"""
+from typing import NamedTuple
+
+from sqlalchemy import func, select
+
+from app import db
+from app.models import UserInteraction, UserRating
+from app.recommender.recommender import PROFILE_WINDOW
+
+CLICK, PLAYED, UNPLAYED = UserInteraction.CLICK, UserInteraction.PLAYED, UserInteraction.UNPLAYED
+
+
+class UserProfile(NamedTuple):
+    clicked: list[int]  # distinct games, oldest to newest latest click
+    played: list[int]   # in the order they were marked played
+    ratings: dict       # {str(game_id): rating}
+
+
+# ---- reads ----
+def _recent_clicks(user_ids: list[int], max_clicks: int) -> dict[int, list[int]]:
+    ui = UserInteraction
+    if len(user_ids) == 1:
+        # one user: walk ix_user_interaction_user_kind_id backwards and stop after max_clicks
+        query = (
+            select(ui.user_id, ui.game_id)
+            .where(ui.user_id == user_ids[0], ui.kind == CLICK)
+            .order_by(ui.id.desc()).limit(max_clicks)
+        )
+        rows = reversed(db.session.execute(query).all())
+    else:
+        rank = func.row_number().over(partition_by=ui.user_id, order_by=ui.id.desc())
+        ranked = (
+            select(ui.user_id, ui.game_id, ui.id, rank.label("rank"))
+            .where(ui.user_id.in_(user_ids), ui.kind == CLICK)
+            .subquery()
+        )
+        rows = db.session.execute(
+            select(ranked.c.user_id, ranked.c.game_id)
+            .where(ranked.c.rank <= max_clicks)
+            .order_by(ranked.c.user_id, ranked.c.id)
+        )
+    clicks: dict[int, dict] = {}
+    for user_id, game_id in rows:
+        seen = clicks.setdefault(user_id, {})
+        seen.pop(game_id, None)  # a repeat click moves the game to its newest position
+        seen[game_id] = None
+    return {user_id: list(seen) for user_id, seen in clicks.items()}
+
+
+def _latest_per_game(table, columns, user_ids: list[int], *where):
+    """Newest row per (user, game) of an append-only table."""
+    rank = func.row_number().over(partition_by=(table.user_id, table.game_id), order_by=table.id.desc())
+    ranked = (
+        select(table.user_id, table.game_id, table.id, *columns, rank.label("rank"))
+        .where(table.user_id.in_(user_ids), *where)
+        .subquery()
+    )
+    return ranked, select(ranked).where(ranked.c.rank == 1).order_by(ranked.c.id)
+
+
+def load_profiles(user_ids, max_clicks: int = PROFILE_WINDOW) -> dict[int, UserProfile]:
+    """UserProfile of every id in `user_ids` (empty lists for users without signals)."""
+    user_ids = list(user_ids)
+    profiles = {user_id: UserProfile([], [], {}) for user_id in user_ids}
+    if not user_ids:
+        return profiles
+
+    if max_clicks > 0:
+        for user_id, clicked in _recent_clicks(user_ids, max_clicks).items():
+            profiles[user_id].clicked.extend(clicked)
+
+    ranked, query = _latest_per_game(
+        UserInteraction, [UserInteraction.kind], user_ids, UserInteraction.kind.in_((PLAYED, UNPLAYED))
+    )
+    for row in db.session.execute(query.where(ranked.c.kind == PLAYED)):
+        profiles[row.user_id].played.append(row.game_id)
+
+    _, query = _latest_per_game(UserRating, [UserRating.rating], user_ids)
+    for row in db.session.execute(query):
+        profiles[row.user_id].ratings[str(row.game_id)] = row.rating
+    return profiles
+
+
+def load_profile(user_id: int, max_clicks: int = PROFILE_WINDOW) -> UserProfile:
+    return load_profiles([user_id], max_clicks)[user_id]
+
+
+def played_games(user_id: int) -> list[int]:
+    return load_profile(user_id, max_clicks=0).played
+
+
+def is_played(user_id: int, game_id: int) -> bool:
+    ui = UserInteraction
+    kind = db.session.scalar(
+        select(ui.kind)
+        .where(ui.game_id == game_id, ui.user_id == user_id, ui.kind.in_((PLAYED, UNPLAYED)))
+        .order_by(ui.id.desc()).limit(1)
+    )
+    return kind == PLAYED
+
+
+def get_rating(user_id: int, game_id: int) -> int | None:
+    return db.session.scalar(
+        select(UserRating.rating)
+        .where(UserRating.user_id == user_id, UserRating.game_id == game_id)
+        .order_by(UserRating.id.desc()).limit(1)
+    )
+
+
+# ---- writes ----
+def record_clicks(events) -> set[int]:
+    """
+    Log (user_id, game_id, created_at) click events with one multi-row INSERT;
+    returns the users who clicked. Any click can move their profile: a repeat
+    click makes its game the newest, and every click shifts the
+    PROFILE_WINDOW of recent events.
+    """
+    events = list(events)
+    if not events:
+        return set()
+    db.session.execute(
+        UserInteraction.__table__.insert(),
+        [{"user_id": user_id, "game_id": game_id, "kind": CLICK, "created_at": created_at}
+         for user_id, game_id, created_at in events],
+    )
+    return {user_id for user_id, _, _ in events}
+
+
+def set_played(user_id: int, game_id: int, played: bool):
+    db.session.add(UserInteraction(user_id=user_id, game_id=game_id, kind=PLAYED if played else UNPLAYED))
+
+
+def add_rating(user_id: int, game_id: int, rating: int):
+    db.session.add(UserRating(user_id=user_id, game_id=game_id, rating=rating))
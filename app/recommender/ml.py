@@ -1,84 +1,701 @@
 # ml.py
+# Train the recommender and write the model directory read by the app:
+#   python -m app.recommender.ml                  full refit from the Game table
+#   python -m app.recommender.ml --source csv     full refit from games.csv
+#   python -m app.recommender.ml --incremental    fold in games changed since the last run
+#
+# Games are streamed from SQL `--chunk-size` rows at a time. With
+# `--text-features hashing` nothing but the model's own arrays is ever held for
+# the whole catalog: a stateless HashingVectorizer plus idf counts gathered in
+# one pass replace the TF-IDF vocabulary, the SVD is fitted on a bounded
+# random sample of rows, and the features go to a memory-mapped scratch file
+# that MiniBatchKMeans reads block by block (see `train_streaming`).
+#
+# The incremental mode keeps the fitted vectorizer, SVD, scaler and KMeans
+# frozen: games whose `last_updated` moved past the model's watermark are
+# transformed, assigned to their nearest centroid and merged into the
+# neighbour index in O(N x changed) instead of rebuilding everything. It falls
+# back to a full refit once drift crosses a threshold (see `train_incremental`).
+#
+# `--cluster-backend minibatch` swaps full-batch KMeans for MiniBatchKMeans on
+# large catalogs, `--threads` caps the BLAS/OpenMP pools used by the SVD,
+# clustering and neighbour stages; every stage prints its wall time, which is
+# also kept in the manifest (`training.timings`).
+import argparse
 import os
-import pickle
+import shutil
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
 import numpy as np
 import pandas as pd
 
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
+from sklearn.pipeline import make_pipeline
 from sklearn.decomposition import TruncatedSVD
-from sklearn.preprocessing import StandardScaler, Normalizer
-from sklearn.cluster import KMeans
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import StandardScaler, Normalizer, normalize
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from threadpoolctl import threadpool_limits
+
+from sqlalchemy import select
+
+from app import create_app, db
+from app.models import Game
+from app.recommender.ann import ANN_MIN_GAMES, IVF_DIR, IVFIndex, ivf_neighbor_index
+from app.recommender.artifact import (
+    MODEL_DIR, TEXT_COLUMNS, ModelArtifactError, TextColumn, load_model, load_transformers, save_model,
+)
+from app.recommender.franchise import extract_franchise_key, franchise_codes
+from app.recommender.ranking import _top_k
+
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+GAMES_PATH = os.path.join(BASE_PATH, "..", "data", "games.csv")
+TOP_K = 100  # neighbours kept per game (self included)
+N_CLUSTERS = 20
+CLUSTER_BACKENDS = ("kmeans", "minibatch")
+
+# Streaming training (--text-features hashing)
+CHUNK_SIZE = 5000          # Game rows fetched per round trip
+HASH_FEATURES = 2 ** 14    # HashingVectorizer columns, ~3x the 5000-term TF-IDF vocabulary
+SVD_SAMPLE = 100_000       # rows the SVD is fitted on
+STREAM_EPOCHS = 3          # partial_fit passes of the clustering over the feature memmap
+
+# Incremental updates stop and trigger a full refit when either is exceeded:
+DRIFT_THRESHOLD = 0.1     # rows folded in since the last full fit / catalog size at that fit
+DISTANCE_THRESHOLD = 1.5  # mean centroid distance of folded-in rows / same mean at fit time
+
+CATALOG_COLUMNS = ("id", "slug", "name", "genres", "tags", "rating", "metacritic", "released", "background_image")
+
+
+class StageTimer:
+    """Prints each training stage as it starts and records its wall time in `timings`."""
+
+    def __init__(self):
+        self.timings: dict[str, float] = {}
+
+    @contextmanager
+    def __call__(self, name: str, message: str):
+        print(f"{message}...", flush=True)
+        t0 = time.perf_counter()
+        yield
+        self.timings[name] = round(self.timings.get(name, 0.0) + time.perf_counter() - t0, 3)
+
+    def report(self):
+        width = max((len(name) for name in self.timings), default=0)
+        for name, seconds in self.timings.items():
+            print(f"  {name:<{width}} {seconds:8.2f}s")
+        print(f"  {'total':<{width}} {sum(self.timings.values()):8.2f}s")
 
 
 # --------------------
 # Load data
 # --------------------
-BASE_PATH = os.path.dirname(os.path.abspath(__file__))
-MODEL_PATH = os.path.join(BASE_PATH, "..", "data", "model.pkl")
-GAMES_PATH = os.path.join(BASE_PATH, "..", "data", "games.csv")
-df = pd.read_csv(GAMES_PATH)
+def iter_game_chunks(chunk_size: int = CHUNK_SIZE, max_id: int | None = None):
+    """
+    Catalog columns of the Game table (up to `max_id`) as DataFrames of up to
+    `chunk_size` rows, in id order. `yield_per` makes the driver stream through
+    a server-side cursor, so only the current chunk is ever fetched into memory.
+    """
+    app = create_app(require_model=False)
+    with app.app_context():
+        columns = [getattr(Game, col) for col in CATALOG_COLUMNS]
+        query = select(*columns).order_by(Game.id)
+        if max_id is not None:
+            query = query.where(Game.id <= max_id)
+        result = db.session.execute(query.execution_options(yield_per=chunk_size))
+        for rows in result.partitions():
+            yield pd.DataFrame(rows, columns=list(CATALOG_COLUMNS))
+
+
+def load_catalog(source: str = "db", chunk_size: int = CHUNK_SIZE) -> pd.DataFrame:
+    """The whole catalog as one frame, from the Game table or from games.csv."""
+    if source == "csv":
+        return pd.read_csv(GAMES_PATH)
+    chunks = list(iter_game_chunks(chunk_size))
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=list(CATALOG_COLUMNS))
+
+
+def load_changed_games(since: datetime) -> pd.DataFrame:
+    """Games whose `last_updated` is after `since`, as catalog rows."""
+    app = create_app(require_model=False)
+    with app.app_context():
+        games = Game.query.filter(Game.last_updated > since).order_by(Game.id).all()
+        return pd.DataFrame(
+            [{col: getattr(game, col) for col in CATALOG_COLUMNS} for game in games],
+            columns=list(CATALOG_COLUMNS),
+        )
+
 
 # --------------------
 # Feature engineering
 # --------------------
-# Text: genres + tags
-df["genres"] = df["genres"].fillna("")
-df["tags"] = df.get("tags", "").fillna("")
+def prepare_features(df: pd.DataFrame, fill_values: dict | None = None) -> tuple[pd.DataFrame, dict]:
+    """
+    Text (genres + tags) and numeric (rating, metacritic, release_year) inputs.
+    Missing ratings are filled with `fill_values` when given (frozen at fit time),
+    otherwise with this frame's means (0 for an all-missing column), which are
+    returned for later calls.
+    """
+    df = df.copy()
+    df["genres"] = df["genres"].fillna("")
+    df["tags"] = df.get("tags", "").fillna("")
+    df["text_features"] = _text_features(df)
+
+    fill_values = dict(fill_values or {})
+    for col in ("rating", "metacritic"):
+        values = pd.to_numeric(df.get(col, np.nan), errors="coerce")
+        fill_values.setdefault(col, float(values.mean()) if values.notna().any() else 0.0)
+        df[col] = values.fillna(fill_values[col])
+
+    if "released" in df.columns:
+        df["release_year"] = pd.to_datetime(df["released"], errors="coerce").dt.year.fillna(0)
+    else:
+        df["release_year"] = 0
+    return df, fill_values
+
+
+def _text_features(df: pd.DataFrame) -> pd.Series:
+    tags = df["tags"] if "tags" in df.columns else pd.Series("", index=df.index)
+    return df["genres"].fillna("").astype(str) + " " + tags.fillna("").astype(str)
+
+
+def _numeric(df: pd.DataFrame) -> np.ndarray:
+    return df[["rating", "metacritic", "release_year"]].values
+
 
-df["text_features"] = df["genres"].astype(str) + " " + df["tags"].astype(str)
+def fit_transformers(df: pd.DataFrame, timer: StageTimer | None = None) -> tuple[dict, np.ndarray]:
+    """Fit vectorizer/SVD/normalizer/scaler on a prepared frame; returns (transformers, X_combined)."""
+    timer = timer or StageTimer()
+    with timer("vectorize", "Vectorizing text features"):
+        vectorizer = TfidfVectorizer(max_features=5000, stop_words="english")
+        X_text = vectorizer.fit_transform(df["text_features"])
 
-# Numeric features: rating, metacritic, release_year
-df["rating"] = df.get("rating", np.nan).fillna(df.get("rating", np.nan).mean())
-df["metacritic"] = df.get("metacritic", np.nan).fillna(df.get("metacritic", np.nan).mean())
+    # Dimensionality reduction
+    with timer("svd", "Reducing dimensions with SVD"):
+        svd = TruncatedSVD(n_components=100, random_state=42)
+        X_reduced = svd.fit_transform(X_text)
 
-if "released" in df.columns:
-    df["release_year"] = pd.to_datetime(df["released"], errors="coerce").dt.year.fillna(0)
-else:
-    df["release_year"] = 0
+    # Normalize text vectors
+    normalizer = Normalizer(copy=False)
+    X_text_final = normalizer.fit_transform(X_reduced)
+
+    # Scale numeric features
+    scaler = StandardScaler()
+    X_num = scaler.fit_transform(_numeric(df))
+
+    transformers = {"vectorizer": vectorizer, "scaler": scaler, "svd": svd, "normalizer": normalizer}
+    return transformers, np.hstack([X_text_final, X_num])
+
+
+def transform(df: pd.DataFrame, transformers: dict) -> np.ndarray:
+    """X_combined for a prepared frame using already fitted transformers."""
+    X_text = transformers["vectorizer"].transform(df["text_features"])
+    X_text_final = transformers["normalizer"].transform(transformers["svd"].transform(X_text))
+    X_num = transformers["scaler"].transform(_numeric(df))
+    return np.hstack([X_text_final, X_num])
 
-numeric_features = df[["rating", "metacritic", "release_year"]].values
 
 # --------------------
-# Vectorization
+# Neighbor index
 # --------------------
-print("Vectorizing text features...")
-vectorizer = TfidfVectorizer(max_features=5000, stop_words="english")
-X_text = vectorizer.fit_transform(df["text_features"])
+def build_neighbor_index(embeddings: np.ndarray, k: int = TOP_K, block_size: int = 1024):
+    """
+    Top-k cosine neighbours for every row of L2-normalized `embeddings`.
+    Works block by block so peak memory is block_size x N instead of N x N.
+    Returns (indices int32 [N, k], scores float32 [N, k]) sorted by descending score.
+    """
+    n = embeddings.shape[0]
+    k = min(k, n)
+    indices = np.empty((n, k), dtype=np.int32)
+    scores = np.empty((n, k), dtype=np.float32)
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        indices[start:stop], scores[start:stop] = _top_k(embeddings[start:stop] @ embeddings.T, k)
+    return indices, scores
+
 
-# Dimensionality reduction
-print("Reducing dimensions with SVD...")
-svd = TruncatedSVD(n_components=100, random_state=42)
-X_reduced = svd.fit_transform(X_text)
+def update_neighbor_index(
+    embeddings: np.ndarray,
+    indices: np.ndarray,
+    scores: np.ndarray,
+    rows: np.ndarray,
+    block_size: int = 1024,
+):
+    """
+    Refresh a top-k index after `rows` of `embeddings` were added or changed.
+    `indices`/`scores` describe the first len(indices) rows; rows past that are
+    new and must be listed in `rows`. Every existing list is merged with its
+    exact scores against `rows` (stale entries pointing at a changed row are
+    dropped first), and the lists of `rows` themselves are rebuilt, so the cost
+    is O(N x len(rows)). The one approximation: a game pushed out of a list
+    earlier does not come back when a changed row's score drops.
+    """
+    n, old_n, k = embeddings.shape[0], len(indices), indices.shape[1]
+    rows = np.unique(rows).astype(np.int32)
+    out_idx = np.empty((n, k), dtype=np.int32)
+    out_scores = np.empty((n, k), dtype=np.float32)
+    touched = embeddings[rows]
 
-# Normalize text vectors
-normalizer = Normalizer(copy=False)
-X_text_final = normalizer.fit_transform(X_reduced)
+    for start in range(0, old_n, block_size):
+        stop = min(start + block_size, old_n)
+        cur_scores = np.where(np.isin(indices[start:stop], rows), -np.inf, scores[start:stop])
+        sims = embeddings[start:stop] @ touched.T
+        candidates = np.hstack([indices[start:stop], np.broadcast_to(rows, sims.shape)])
+        out_idx[start:stop], out_scores[start:stop] = _top_k(np.hstack([cur_scores, sims]), k, candidates)
 
-# Scale numeric features
-scaler = StandardScaler()
-X_num = scaler.fit_transform(numeric_features)
+    for start in range(0, len(rows), block_size):
+        block = rows[start:start + block_size]
+        out_idx[block], out_scores[block] = _top_k(embeddings[block] @ embeddings.T, k)
+    return out_idx, out_scores
 
-# Combine text + numeric features
-X_combined = np.hstack([X_text_final, X_num])
 
 # --------------------
 # Clustering
 # --------------------
-print("Clustering with KMeans...")
-kmeans = KMeans(n_clusters=20, random_state=42, n_init=10)
-df["cluster"] = kmeans.fit_predict(X_combined)
+def make_clusterer(backend: str = "kmeans", n_clusters: int = N_CLUSTERS):
+    """
+    Unfitted clustering estimator. "kmeans" is full-batch Lloyd with 10 restarts;
+    "minibatch" updates centroids from random batches, so each iteration costs
+    O(batch_size) instead of O(N) - the choice once the catalog is large.
+    Both expose predict/transform, which is all incremental updates need.
+    """
+    if backend == "kmeans":
+        return KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+    if backend == "minibatch":
+        return MiniBatchKMeans(n_clusters=n_clusters, random_state=42, n_init=3, batch_size=4096)
+    raise ValueError(f"unknown cluster backend {backend!r}, expected one of {CLUSTER_BACKENDS}")
 
-# --------------------
-# Similarity matrix
-# --------------------
-print("Computing cosine similarity matrix...")
-similarity = cosine_similarity(X_combined)
 
 # --------------------
-# Save model
+# Training
 # --------------------
-with open(MODEL_PATH, "wb") as f:
-    pickle.dump((df, vectorizer, scaler, svd, normalizer, kmeans, similarity), f)
+def _catalog(df: pd.DataFrame) -> dict:
+    """Per-row model columns of prepared catalog rows: ids, filled ratings and the text columns."""
+    catalog = {
+        "ids": df["id"].to_numpy(dtype=np.int64),
+        "rating": df["rating"].to_numpy(dtype=np.float32),
+        "metacritic": df["metacritic"].to_numpy(dtype=np.float32),
+    }
+    for col in TEXT_COLUMNS:
+        if col in df.columns:
+            catalog[col] = TextColumn.from_values(df[col])
+    return catalog
+
+
+def _fit_and_save(
+    catalog: dict,
+    X_combined: np.ndarray,
+    kmeans,
+    cluster: np.ndarray,
+    distances: np.ndarray,
+    transformers: dict,
+    fill_values: dict,
+    path: str,
+    started: datetime,
+    cluster_backend: str = "kmeans",
+    timer: StageTimer | None = None,
+    block_size: int = CHUNK_SIZE,
+) -> dict:
+    """
+    Index and write a model for clustered catalog rows and their features.
+    `X_combined` may be a memory-mapped scratch file: it is only read block by block.
+    """
+    timer = timer or StageTimer()
+    n = len(catalog["ids"])
+
+    # Store rows grouped by cluster: every cluster is then one contiguous slice
+    # of the memory-mapped arrays, which cluster-pruned ranking scores in place.
+    order = np.argsort(cluster, kind="stable")
+    cluster = cluster[order]
+    embeddings = np.empty(X_combined.shape, dtype=np.float32)
+    for start in range(0, n, block_size):
+        embeddings[start:start + block_size] = normalize(X_combined[order[start:start + block_size]])
+    catalog = {
+        name: TextColumn.from_values(col.take(order)) if isinstance(col, TextColumn) else col[order]
+        for name, col in catalog.items()
+    }
+
+    # Unit-length rows make a dot product equal to cosine similarity, so only the
+    # top-K neighbours per game are kept instead of the dense N x N matrix. Past
+    # ANN_MIN_GAMES even that O(N²) pass is too slow and the IVF lists are used;
+    # smaller catalogs are served exactly and get no index.
+    neighbors = "ivf" if len(embeddings) > ANN_MIN_GAMES else "exact"
+    ivf = None
+    if neighbors == "ivf":
+        with timer("ann", "Building IVF index"):
+            ivf = IVFIndex.build(embeddings)
+    with timer("neighbors", f"Building top-{TOP_K} neighbor index ({neighbors})"):
+        if neighbors == "ivf":
+            neighbor_idx, neighbor_scores = ivf_neighbor_index(embeddings, ivf, k=TOP_K)
+        else:
+            neighbor_idx, neighbor_scores = build_neighbor_index(embeddings, k=TOP_K)
+
+    # Regex-heavy key extraction runs once here; serving only compares int codes.
+    with timer("franchise", "Coding franchise keys"):
+        names = catalog["name"].tolist()
+        slugs = catalog["slug"].tolist() if "slug" in catalog else [""] * n
+        franchise, franchise_keys = franchise_codes(names, slugs)
+
+    arrays = {
+        **catalog,
+        "id_order": np.argsort(catalog["ids"], kind="stable"),
+        "cluster": cluster.astype(np.int32),
+        "franchise": franchise,
+        "embeddings": embeddings,
+        "neighbor_idx": neighbor_idx,
+        "neighbor_scores": neighbor_scores,
+    }
+
+    transformers.update(kmeans=kmeans, fill_values=fill_values, franchise_keys=franchise_keys.tolist())
+    training = {
+        "mode": "full",
+        "watermark": started.isoformat(),
+        "cluster_backend": cluster_backend,
+        "neighbors": neighbors,
+        "fit_n_games": n,
+        "fit_mean_distance": float(distances.mean()),
+        "rows_since_fit": 0,
+        "distance_sum_since_fit": 0.0,
+        "timings": timer.timings,
+    }
+    with timer("save", "Writing model"):
+        # The index goes before the manifest, so a reader never sees a new model
+        # with an old index; an index left by a larger catalog is dropped.
+        if ivf is not None:
+            ivf.save(path)
+        else:
+            shutil.rmtree(os.path.join(path, IVF_DIR), ignore_errors=True)
+        return save_model(arrays, transformers, path=path, training=training)
+
+
+def train_full(
+    df: pd.DataFrame,
+    path: str = MODEL_DIR,
+    cluster_backend: str = "kmeans",
+    timer: StageTimer | None = None,
+) -> dict:
+    """Refit every transformer and the clustering on `df` and write a fresh model."""
+    started = datetime.now()
+    timer = timer or StageTimer()
+    df, fill_values = prepare_features(df)
+    transformers, X_combined = fit_transformers(df, timer)
+    with timer("cluster", f"Clustering with {cluster_backend}"):
+        kmeans = make_clusterer(cluster_backend)
+        cluster = kmeans.fit_predict(X_combined)
+        distances = kmeans.transform(X_combined).min(axis=1)
+    return _fit_and_save(
+        _catalog(df), X_combined, kmeans, cluster, distances, transformers, fill_values,
+        path, started, cluster_backend, timer,
+    )
+
+
+def _cluster_blocks(X: np.ndarray, block_size: int, epochs: int = STREAM_EPOCHS):
+    """
+    MiniBatchKMeans fitted with partial_fit on row blocks of `X` (shuffled block
+    order, `epochs` passes), then labels and centroid distances block by block.
+    """
+    n = len(X)
+    starts = np.arange(0, n, block_size)
+    rng = np.random.default_rng(42)
+    kmeans = MiniBatchKMeans(n_clusters=N_CLUSTERS, random_state=42, n_init=3, batch_size=block_size)
+    for _ in range(epochs):
+        # only the last block can be short; it never goes first, where partial_fit seeds the centroids
+        for start in [*rng.permutation(starts[:-1]), starts[-1]]:
+            kmeans.partial_fit(X[start:start + block_size])
+    cluster = np.empty(n, dtype=np.int32)
+    distances = np.empty(n, dtype=np.float32)
+    for start in starts:
+        d = kmeans.transform(X[start:start + block_size])
+        cluster[start:start + block_size] = d.argmin(axis=1)
+        distances[start:start + block_size] = d.min(axis=1)
+    return kmeans, cluster, distances
+
+
+def train_streaming(
+    path: str = MODEL_DIR,
+    chunk_size: int = CHUNK_SIZE,
+    n_features: int = HASH_FEATURES,
+    sample_size: int = SVD_SAMPLE,
+    timer: StageTimer | None = None,
+) -> dict:
+    """
+    Full refit from the Game table in two streamed passes, memory bounded by the
+    model itself plus one chunk:
+
+    1. hash each chunk's text, count document frequencies for the idf weights,
+       sum ratings for the fill means and keep a reservoir sample of texts;
+    2. fit the SVD on the sample, then transform chunk by chunk straight into a
+       preallocated float32 memmap of X_combined next to the model, fitting
+       the numeric scaler with partial_fit on the way.
+
+    Clustering is MiniBatchKMeans partial_fit over row blocks of that memmap,
+    and the embeddings are written block by block in cluster order; the
+    scratch file is removed once the model is saved.
+    """
+    started = datetime.now()
+    timer = timer or StageTimer()
+    hasher = HashingVectorizer(n_features=n_features, stop_words="english", alternate_sign=False, norm=None)
+    rng = np.random.default_rng(42)
+    doc_freq = np.zeros(n_features, dtype=np.int64)
+    totals = {"rating": [0.0, 0], "metacritic": [0.0, 0]}
+    sample, seen, max_id = [], 0, None
+
+    with timer("pass1", "Pass 1/2: hashing text and counting document frequencies"):
+        for chunk in iter_game_chunks(chunk_size):
+            texts = _text_features(chunk).tolist()
+            doc_freq += np.bincount(hasher.transform(texts).indices, minlength=n_features)
+            for col, total in totals.items():
+                values = pd.to_numeric(chunk[col], errors="coerce")
+                total[0] += float(values.sum())
+                total[1] += int(values.count())
+            # reservoir sampling: every row has the same chance to end up in `sample`
+            slots = rng.integers(0, np.arange(seen + 1, seen + len(texts) + 1))
+            for i, (text, slot) in enumerate(zip(texts, slots)):
+                if seen + i < sample_size:
+                    sample.append(text)
+                elif slot < sample_size:
+                    sample[slot] = text
+            seen += len(texts)
+            max_id = int(chunk["id"].iloc[-1])
+    if not seen:
+        raise ValueError("the Game table is empty, nothing to train on")
+
+    fill_values = {col: total / count if count else 0.0 for col, (total, count) in totals.items()}
+    tfidf = TfidfTransformer()
+    tfidf.idf_ = np.log((1 + seen) / (1 + doc_freq)) + 1  # same smoothing as TfidfVectorizer
+    vectorizer = make_pipeline(hasher, tfidf)
+
+    with timer("svd", f"Reducing dimensions with SVD (fitted on {len(sample)} sampled rows)"):
+        svd = TruncatedSVD(n_components=min(100, len(sample) - 1), random_state=42)
+        normalizer = Normalizer(copy=False)
+        normalizer.fit(svd.fit_transform(vectorizer.transform(sample)))
+    del sample
+
+    os.makedirs(path, exist_ok=True)
+    scratch = os.path.join(path, f".X_combined.scratch-{os.getpid()}")
+    n_text = svd.n_components
+    X_combined = np.memmap(scratch, dtype=np.float32, mode="w+", shape=(seen, n_text + 3))
+    try:
+        scaler = StandardScaler()
+        catalog = {
+            "ids": np.empty(seen, dtype=np.int64),
+            "rating": np.empty(seen, dtype=np.float32),
+            "metacritic": np.empty(seen, dtype=np.float32),
+        }
+        text_parts = {col: [] for col in TEXT_COLUMNS}
+        n = 0
+        with timer("pass2", "Pass 2/2: transforming text features"):
+            for chunk in iter_game_chunks(chunk_size, max_id):
+                stop = n + len(chunk)
+                if stop > seen:
+                    raise RuntimeError("games were added below the last id during training; run it again")
+                df, _ = prepare_features(chunk, fill_values)
+                X_combined[n:stop, :n_text] = normalizer.transform(
+                    svd.transform(vectorizer.transform(df["text_features"]))
+                )
+                numeric = _numeric(df)
+                X_combined[n:stop, n_text:] = numeric
+                scaler.partial_fit(numeric)
+                for name, values in _catalog(df).items():
+                    if name in text_parts:
+                        text_parts[name].append(values)
+                    else:
+                        catalog[name][n:stop] = values
+                n = stop
+
+        # games deleted between the passes leave the tail unused
+        X_combined = X_combined[:n]
+        catalog = {name: values[:n] for name, values in catalog.items()}
+        catalog.update({col: TextColumn.concat(parts) for col, parts in text_parts.items() if parts})
+        for start in range(0, n, chunk_size):
+            X_combined[start:start + chunk_size, n_text:] = scaler.transform(X_combined[start:start + chunk_size, n_text:])
+
+        with timer("cluster", "Clustering with minibatch (partial_fit over row blocks)"):
+            kmeans, cluster, distances = _cluster_blocks(X_combined, max(chunk_size, 4 * N_CLUSTERS))
+        transformers = {"vectorizer": vectorizer, "scaler": scaler, "svd": svd, "normalizer": normalizer}
+        return _fit_and_save(
+            catalog, X_combined, kmeans, cluster, distances, transformers, fill_values,
+            path, started, "minibatch", timer, block_size=chunk_size,
+        )
+    finally:
+        del X_combined
+        os.remove(scratch)
+
+
+def train(
+    path: str = MODEL_DIR,
+    source: str = "db",
+    text_features: str = "tfidf",
+    chunk_size: int = CHUNK_SIZE,
+    cluster_backend: str = "kmeans",
+    threads: int | None = None,
+) -> dict:
+    """
+    Full refit: exact TF-IDF on the loaded catalog, or the streaming hashing
+    pipeline (db only, always clustered with MiniBatchKMeans partial_fit).
+    `threads` caps the BLAS and OpenMP pools (None leaves the library
+    defaults); per-stage wall times are printed at the end.
+    """
+    if text_features == "hashing" and source != "db":
+        raise ValueError("--text-features hashing streams from the database, use --source db")
+    timer = StageTimer()
+    with threadpool_limits(limits=threads):
+        if text_features == "hashing":
+            manifest = train_streaming(path, chunk_size, timer=timer)
+        else:
+            with timer("load", f"Loading catalog from {source}"):
+                df = load_catalog(source, chunk_size)
+            manifest = train_full(df, path, cluster_backend, timer)
+    timer.report()
+    return manifest
+
+
+def _franchise_code(key: str, codes: dict, keys: list) -> int:
+    if key not in codes:
+        codes[key] = len(keys)
+        keys.append(key)
+    return codes[key]
+
+
+def train_incremental(
+    path: str = MODEL_DIR,
+    drift_threshold: float = DRIFT_THRESHOLD,
+    distance_threshold: float = DISTANCE_THRESHOLD,
+    **train_options,
+) -> dict:
+    """
+    Fold games changed since the model's watermark into the existing model with
+    the frozen transformers. Refits from scratch instead when the model has no
+    training bookkeeping yet, or when the rows folded in since the last full fit
+    exceed `drift_threshold` of the catalog, or their mean distance to the
+    assigned centroid exceeds `distance_threshold` times the fit-time mean.
+    `train_options` are passed on to `train` for such a refit.
+    """
+    model = load_model(path, mmap_mode=None)
+    training = model.manifest.get("training")
+    transformers = load_transformers(path)
+    if not training or "franchise_keys" not in transformers:
+        print("Model has no incremental bookkeeping, running a full refit...")
+        return train(path, **train_options)
+
+    started = datetime.now()
+    changed = load_changed_games(datetime.fromisoformat(training["watermark"]))
+    if changed.empty:
+        print("No games changed since the last run, model is up to date.")
+        return model.manifest
+
+    changed, _ = prepare_features(changed, transformers["fill_values"])
+    kmeans = transformers["kmeans"]
+    # streaming refits cluster float32 features; predict wants the centroids' dtype
+    X_combined = transform(changed, transformers).astype(kmeans.cluster_centers_.dtype, copy=False)
+    cluster = kmeans.predict(X_combined)
+    distances = kmeans.transform(X_combined).min(axis=1)
+
+    rows_since_fit = training["rows_since_fit"] + len(changed)
+    distance_sum = training["distance_sum_since_fit"] + float(distances.sum())
+    drift = rows_since_fit / max(training["fit_n_games"], 1)
+    distance_ratio = distance_sum / rows_since_fit / max(training["fit_mean_distance"], 1e-12)
+    print(f"{len(changed)} changed games, drift {drift:.3f}, centroid distance ratio {distance_ratio:.2f}")
+    if drift > drift_threshold or distance_ratio > distance_threshold:
+        print("Drift threshold crossed, running a full refit...")
+        return train(path, **train_options)
+
+    # Map changed ids to rows: known ids are overwritten in place, new ids appended.
+    arrays = dict(model.arrays)
+    old_n = len(model)
+    ids = arrays["ids"]
+    changed_ids = changed["id"].to_numpy(dtype=np.int64)
+    pos = np.searchsorted(ids, changed_ids, sorter=arrays["id_order"])
+    pos = arrays["id_order"][np.minimum(pos, old_n - 1)]
+    known = ids[pos] == changed_ids
+    rows = np.where(known, pos, 0)
+    rows[~known] = old_n + np.arange(int((~known).sum()))
+    n = old_n + int((~known).sum())
+
+    keys = list(transformers["franchise_keys"])
+    codes = {key: code for code, key in enumerate(keys)}
+    slugs = changed["slug"].fillna("").astype(str) if "slug" in changed.columns else [""] * len(changed)
+    franchise = [
+        _franchise_code(extract_franchise_key(str(name), str(slug)), codes, keys)
+        for name, slug in zip(changed["name"].fillna("").astype(str), slugs)
+    ]
+
+    updates = {
+        "ids": changed_ids,
+        "cluster": cluster.astype(np.int32),
+        "franchise": np.asarray(franchise, dtype=np.int32),
+        "rating": changed["rating"].to_numpy(dtype=np.float32),
+        "metacritic": changed["metacritic"].to_numpy(dtype=np.float32),
+        "embeddings": normalize(X_combined).astype(np.float32),
+    }
+    for name, values in updates.items():
+        current = arrays[name]
+        grown = np.concatenate([current, np.zeros((n - old_n,) + current.shape[1:], dtype=current.dtype)])
+        grown[rows] = values
+        arrays[name] = grown
+    for col, column in model.text.items():
+        values = column.tolist() + [""] * (n - old_n)
+        if col in changed.columns:
+            for row, value in zip(rows.tolist(), TextColumn.from_values(changed[col]).tolist()):
+                values[row] = value
+        arrays[col] = TextColumn.from_values(values)
+
+    print(f"Updating neighbor index for {len(rows)} rows...")
+    arrays["id_order"] = np.argsort(arrays["ids"], kind="stable")
+    arrays["neighbor_idx"], arrays["neighbor_scores"] = update_neighbor_index(
+        arrays["embeddings"], arrays["neighbor_idx"], arrays["neighbor_scores"], rows,
+    )
+
+    try:
+        IVFIndex.load(path, mmap_mode=None).reassign(arrays["embeddings"], rows).save(path)
+    except ModelArtifactError:
+        print(f"Model has no IVF index; it is built by the next full refit past {ANN_MIN_GAMES} games.")
+
+    transformers["franchise_keys"] = keys
+    training = dict(
+        training,
+        mode="incremental",
+        watermark=started.isoformat(),
+        rows_since_fit=rows_since_fit,
+        distance_sum_since_fit=distance_sum,
+    )
+    return save_model(arrays, transformers, path=path, training=training)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the recommender model.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="fold in games changed since the last run instead of refitting")
+    parser.add_argument("--drift-threshold", type=float, default=DRIFT_THRESHOLD)
+    parser.add_argument("--distance-threshold", type=float, default=DISTANCE_THRESHOLD)
+    parser.add_argument("--source", choices=("db", "csv"), default="db",
+                        help="full refits read the Game table (default) or app/data/games.csv")
+    parser.add_argument("--text-features", choices=("tfidf", "hashing"), default="tfidf",
+                        help="hashing streams the catalog with bounded memory (db only)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--cluster-backend", choices=CLUSTER_BACKENDS, default="kmeans",
+                        help="minibatch scales to large catalogs at a small cost in cluster quality "
+                             "(tfidf only; hashing always uses minibatch)")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="cap BLAS/OpenMP threads for SVD, clustering and the neighbor index")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    args = parser.parse_args()
+
+    train_options = {
+        "source": args.source,
+        "text_features": args.text_features,
+        "chunk_size": args.chunk_size,
+        "cluster_backend": args.cluster_backend,
+        "threads": args.threads,
+    }
+    if args.incremental:
+        manifest = train_incremental(args.model_dir, args.drift_threshold, args.distance_threshold, **train_options)
+    else:
+        manifest = train(args.model_dir, **train_options)
+    print(f"✅ Training complete ({manifest['n_games']} games). Model saved to {os.path.normpath(args.model_dir)}")
+
 
-print("✅ Training complete. Model saved as model.pkl")
+if __name__ == "__main__":
+    main()
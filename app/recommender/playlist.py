@@ -4,7 +4,8 @@ import json
 import requests
 import pandas as pd
 from bs4 import BeautifulSoup
-from app.recommender.recommender import df, extract_franchise_key
+from app.recommender.franchise import extract_franchise_key
+from app.recommender.recommender import catalog_frame
 
 CACHE_FILE = os.path.join(os.path.dirname(__file__), "franchise_cache.json")
 
@@ -119,7 +120,7 @@ def optimize_play_order(game_ids: list[int]) -> list[dict]:
     if not game_ids:
         return []
 
-    sub_df = df[df["id"].isin(game_ids)].copy()
+    sub_df = catalog_frame(game_ids)
     if sub_df.empty:
         return []
 
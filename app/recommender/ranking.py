@@ -0,0 +1,74 @@
+# ranking.py
+"""
+Partial top-n selection shared by every recommendation path.
+
+Requests only ever need 12–60 games, so instead of a full O(N log N) argsort
+over the catalog we argpartition in O(N) and sort just the selected head.
+"""
+import numpy as np
+
+
+def _masked(scores: np.ndarray, exclude) -> np.ndarray:
+    """Copy of `scores` with excluded rows set to -inf (no copy when nothing is excluded)."""
+    scores = np.asarray(scores)
+    if exclude is None:
+        return scores
+    scores = scores.astype(np.result_type(scores.dtype, np.float32), copy=True)
+    scores[exclude] = -np.inf
+    return scores
+
+
+def _select(scores: np.ndarray, n: int) -> np.ndarray:
+    n = min(n, len(scores))
+    if n <= 0:
+        return np.empty(0, dtype=np.int64)
+    head = np.argpartition(-scores, n - 1)[:n]
+    head = head[np.lexsort((head, -scores[head]))]  # best first, ties by index
+    return head[scores[head] > -np.inf]
+
+
+def top_n(scores: np.ndarray, n: int, exclude=None) -> np.ndarray:
+    """
+    Indices of the `n` highest `scores`, best first.
+    `exclude` is a boolean mask or an index array of rows that must not be returned.
+    """
+    return _select(_masked(scores, exclude), n)
+
+
+def cap_per_group(candidates: np.ndarray, groups: np.ndarray, n: int, limit: int) -> np.ndarray:
+    """Keep `candidates` in order, at most `limit` per group label, until `n` are taken."""
+    counts, out = {}, []
+    for i, g in zip(candidates.tolist(), np.asarray(groups[candidates]).tolist()):
+        if counts.get(g, 0) < limit:
+            counts[g] = counts.get(g, 0) + 1
+            out.append(i)
+            if len(out) >= n:
+                break
+    return np.asarray(out, dtype=np.int64)
+
+
+def top_n_diverse(scores: np.ndarray, n: int, groups: np.ndarray, limit=3, exclude=None, overfetch=3) -> np.ndarray:
+    """
+    `top_n` with at most `limit` results per group (e.g. franchise code).
+    Over-fetches n * overfetch candidates and doubles the pool only when the
+    group cap leaves fewer than `n`, so the usual case is a single partition.
+    """
+    scores = _masked(scores, exclude)
+    available = int(np.count_nonzero(scores > -np.inf))
+    pool = max(n * overfetch, n)
+    while True:
+        picked = cap_per_group(_select(scores, pool), groups, n, limit)
+        if len(picked) >= n or pool >= available:
+            return picked
+        pool *= 2
+
+
+def _top_k(sims: np.ndarray, k: int, candidates: np.ndarray | None = None):
+    """Best k columns of every row of `sims`, sorted by descending score."""
+    part = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(sims, part, axis=1)
+    order = np.argsort(-part_scores, axis=1)
+    part = np.take_along_axis(part, order, axis=1)
+    if candidates is not None:
+        part = np.take_along_axis(candidates, part, axis=1)
+    return part, np.take_along_axis(part_scores, order, axis=1)
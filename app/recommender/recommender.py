@@ -1,203 +1,438 @@
-import pickle, os
+import os
 import numpy as np
 import pandas as pd
+from functools import lru_cache
+from typing import NamedTuple
+from flask import g
 from app.models import Game
-import re
-
-BASE_PATH = os.path.dirname(os.path.abspath(__file__))
-MODEL_PATH = os.path.join(BASE_PATH, "..", "data", "model.pkl")
-
-with open(MODEL_PATH, "rb") as f:
-    df, vectorizer, scaler, svd, normalizer, kmeans, similarity = pickle.load(f)
+from app.recommender.game_store import game_store
+from app.recommender.ann import ANN_MIN_GAMES, IVFIndex
+from app.recommender.artifact import MODEL_DIR, TEXT_COLUMNS, ModelArtifact, ModelArtifactError, load_model
+from app.recommender.ranking import top_n, top_n_diverse
+
+
+# ---- Model ----
+# The model is opened on first use rather than at import, so importing the
+# package (e.g. from the trainer) does not require a model to exist yet; the web
+# app calls get_model() in create_app so a bad artifact fails boot instead.
+# Arrays are memory-mapped, so opening is cheap.
+@lru_cache(maxsize=1)
+def get_model() -> ModelArtifact:
+    return load_model(MODEL_DIR)
+
+def reload_model():
+    """Drop the open model and everything derived from it; next use reopens MODEL_DIR."""
+    get_model.cache_clear()
+    _pop_scores.cache_clear()
+    _ann_index.cache_clear()
+    _retrieval_index.cache_clear()
+
+# Keyed on the model object, like the batch scorer's matrices.
+@lru_cache(maxsize=1)
+def _ann_index(model: ModelArtifact) -> IVFIndex | None:
+    """IVF index of catalogs above ANN_MIN_GAMES; None for smaller ones or a missing/stale index."""
+    if model.path is None or len(model) <= ANN_MIN_GAMES:
+        return None
+    try:
+        index = IVFIndex.load(model.path)
+    except ModelArtifactError:
+        return None
+    return index if len(index) == len(model) else None
 
 
 # ---- Helpers ----
-def _norm_text(s: str) -> str:
-    return re.sub(r"[^a-z0-9\s-]", "", (s or "").lower()).strip()
-
-def extract_franchise_key(name: str, slug: str) -> str:
-    s = (slug or _norm_text(name or ""))
-    s = re.sub(r"-(remastered|definitive|complete|goty|ultimate|hd|vr|redux)$", "", s)
-    s = re.sub(r"-(\d+|[ivx]+)$", "", s)
-    s = re.sub(r"-{2,}", "-", s).strip("-")
-    if not s:
-        tokens = _norm_text(name).split()
-        s = "-".join(tokens[:3])
-    return s
-
-def build_franchise_index(_df: pd.DataFrame):
-    keys = _df.apply(lambda r: extract_franchise_key(r["name"], r.get("slug", "")), axis=1)
-    mapping = {}
-    for idx, key in enumerate(keys):
-        mapping.setdefault(key, set()).add(_df.iloc[idx]["id"])
-    return mapping
-
-FRANCHISE_INDEX = build_franchise_index(df)
-
 # Popularity prior: combine rating & metacritic → z-score → [0,1]
-def _popularity_scores(_df: pd.DataFrame):
-    pop = _df[["rating", "metacritic"]].copy()
-    for col in ["rating", "metacritic"]:
-        if col not in pop.columns:
-            pop[col] = np.nan
-    pop = pop.fillna(pop.mean())
-    z = (pop - pop.mean()) / (pop.std(ddof=0) + 1e-9)
+def _popularity_scores(model: ModelArtifact):
+    pop = np.column_stack([model.rating, model.metacritic]).astype(np.float64)
+    pop = np.where(np.isnan(pop), np.nanmean(pop, axis=0), pop)
+    z = (pop - pop.mean(axis=0)) / (pop.std(axis=0) + 1e-9)
     s = z.mean(axis=1)
     s = (s - s.min()) / (s.max() - s.min() + 1e-9)
-    return s.values
-
-POP_SCORES = _popularity_scores(df)
-
-POP_SCORES = _popularity_scores(df)
+    return s
 
-# Quick index lookups
-ID_TO_INDEX = {int(row.id): idx for idx, row in enumerate(df[["id"]].itertuples(index=False))}
-INDEX_TO_ID = df["id"].to_numpy()
+@lru_cache(maxsize=1)
+def _pop_scores():
+    return _popularity_scores(get_model())
+
+# Quick index lookups (binary search over the sorted-id permutation, no per-worker dict)
+def _index_of(game_ids) -> np.ndarray:
+    """Row index for each game id, -1 where the id is not in the model."""
+    model = get_model()
+    ids = np.asarray(game_ids, dtype=np.int64).reshape(-1)
+    if not len(ids) or not len(model):
+        return np.full(len(ids), -1, dtype=np.int64)
+    pos = np.searchsorted(model.ids, ids, sorter=model.id_order)
+    rows = model.id_order[np.minimum(pos, len(model) - 1)]
+    return np.where(model.ids[rows] == ids, rows, -1)
+
+def _index_of_one(game_id: int) -> int | None:
+    idx = int(_index_of([int(game_id)])[0])
+    return idx if idx >= 0 else None
+
+def _records(idxs) -> list[dict]:
+    """Catalog rows as plain dicts (same shape the DataFrame records used to have)."""
+    model = get_model()
+    idxs = np.asarray(idxs, dtype=np.int64)
+    cols = {
+        "id": model.ids[idxs].tolist(),
+        "cluster": model.cluster[idxs].tolist(),
+        "rating": model.rating[idxs].tolist(),
+        "metacritic": model.metacritic[idxs].tolist(),
+    }
+    for col in TEXT_COLUMNS:
+        if col in model.text:
+            cols[col] = model.text[col].take(idxs)
+    return [dict(zip(cols, vals)) for vals in zip(*cols.values())]
+
+def catalog_frame(game_ids: list[int]) -> pd.DataFrame:
+    """Catalog metadata for `game_ids` as a small DataFrame (unknown ids are dropped)."""
+    idxs = _index_of(game_ids)
+    return pd.DataFrame(_records(idxs[idxs >= 0]))
 
 # ---- Public API for app ----
 def get_diverse_feed(n=60):
-    n = min(n, len(df))
-    return _enrich_with_details(df.sample(n).to_dict(orient="records"))
+    model = get_model()
+    n = min(n, len(model))
+    idxs = np.random.choice(len(model), n, replace=False)
+    return _enrich_with_details(_records(idxs))
+
+def _similar_indices(model: ModelArtifact, idx: int, n: int, within_cluster_first=True) -> np.ndarray:
+    """
+    Rows of the n games most similar to row `idx`; same-cluster games first if asked.
+    Fallback scans cover the whole catalog, or only the row's IVF candidates once
+    the catalog is past ANN_MIN_GAMES.
+    """
+    index = _ann_index(model)
+    query = model.embeddings[idx]
+    nbrs = np.asarray(model.neighbor_idx[idx])
+    nbrs = nbrs[nbrs != idx]
+    if len(nbrs) < n and len(nbrs) < len(model) - 1:
+        # Neighbour list is shorter than the request → scan for the rest.
+        if index is None:
+            nbrs = top_n(model.embeddings @ query, n, exclude=[idx])
+        else:
+            cand = index.candidates(query, min_rows=n + 1)
+            nbrs = cand[top_n(model.embeddings[cand] @ query, n, exclude=cand == idx)]
+    if not within_cluster_first:
+        return nbrs[:n]
+
+    c = model.cluster[idx]
+    same_mask = model.cluster[nbrs] == c
+    same = nbrs[same_mask]
+    if len(same) < n:
+        if index is None:
+            members = np.flatnonzero(model.cluster == c)
+        else:
+            cand = index.candidates(query)
+            members = np.union1d(cand[model.cluster[cand] == c], same)
+        if len(members) - 1 > len(same):
+            # The cluster has members outside the neighbour list → rank them exactly.
+            sims = model.embeddings[members] @ query
+            same = members[top_n(sims, n, exclude=members == idx)]
+    return np.concatenate([same, nbrs[~same_mask]])[:n]
 
 def recommend_similar_games(game_id: int, n=20, within_cluster_first=True):
-    if game_id not in df["id"].values:
+    idx = _index_of_one(game_id)
+    if idx is None:
         return get_diverse_feed(n)
-    idx = ID_TO_INDEX[int(game_id)]
-    sims = similarity[idx]
-    order = np.argsort(-sims)
-
-    if within_cluster_first and "cluster" in df.columns:
-        c = df.iloc[idx].get("cluster")
-        same = [i for i in order if df.iloc[i].get("cluster") == c and INDEX_TO_ID[i] != game_id]
-        rest = [i for i in order if INDEX_TO_ID[i] != game_id and i not in same]
-        final = (same + rest)[:n]
-    else:
-        final = [i for i in order if INDEX_TO_ID[i] != game_id][:n]
-
-    return _enrich_with_details(df.iloc[final].to_dict(orient="records"))
+    final = _similar_indices(get_model(), idx, n, within_cluster_first)
+    return _enrich_with_details(_records(final))
 
 
 
 def _franchise_boost_vector(played_ids: list[int], weight=1.0):
     """Return a 1D array (len=df) with boosts for titles in same franchise as any played."""
-    boost = np.zeros(len(df), dtype=np.float32)
+    model = get_model()
+    boost = np.zeros(len(model), dtype=np.float32)
     if not played_ids:
         return boost
-    keys = set()
-    for pid in played_ids:
-        if pid not in ID_TO_INDEX:
-            continue
-        row = df.iloc[ID_TO_INDEX[pid]]
-        keys.add(extract_franchise_key(row["name"], row.get("slug", "")))
-    candidate_ids = set()
-    for k in keys:
-        candidate_ids |= FRANCHISE_INDEX.get(k, set())
-    # small boost for those candidates
-    idxs = [ID_TO_INDEX[i] for i in candidate_ids if i in ID_TO_INDEX]
-    boost[idxs] = weight
+    idxs = _index_of(played_ids)
+    codes = np.unique(model.franchise[idxs[idxs >= 0]])
+    if len(codes):
+        # small boost for every title sharing a franchise code with a played game
+        boost[np.isin(model.franchise, codes)] = weight
     return boost
 
 
-def _content_profile_sim(clicked_ids: list[int]) -> np.ndarray:
-    """Average similarity of clicked games → 1D score per game."""
-    idxs = [ID_TO_INDEX[cid] for cid in clicked_ids if cid in ID_TO_INDEX]
-    if not idxs:
-        return np.zeros(len(df), dtype=np.float32)
+def _scatter_neighbors(idxs: list[int], weights) -> np.ndarray:
+    """Weighted sum of the sparse top-K similarity rows of `idxs` → 1D score per game."""
+    model = get_model()
+    rows = model.neighbor_idx[idxs].ravel()
+    vals = (model.neighbor_scores[idxs] * np.asarray(weights, dtype=np.float32)[:, None]).ravel()
+    return np.bincount(rows, weights=vals, minlength=len(model)).astype(np.float32)
+
+
+# Content profile: decayed mean of clicked-game embeddings, scored with one
+# dot product against the catalog instead of averaging per-click similarity rows.
+PROFILE_DECAY = 0.8    # more decay = older clicks contribute less
+PROFILE_WINDOW = 50    # 0.8**50 ≈ 1e-5, older clicks no longer move the profile
 
-    decay = 0.8  # more decay = older clicks contribute less
-    weights = [decay ** (len(idxs) - 1 - i) for i in range(len(idxs))]
+def _click_weights(clicked_ids: list[int]) -> tuple[np.ndarray, np.ndarray]:
+    """(rows, weights) of the most recent known clicks; weights already divided by their count."""
+    idxs = _index_of(list(clicked_ids)[-PROFILE_WINDOW:])
+    idxs = idxs[idxs >= 0]
+    weights = PROFILE_DECAY ** np.arange(len(idxs) - 1, -1, -1, dtype=np.float32)
+    return idxs, weights / max(len(idxs), 1)
 
-    sims = np.vstack([similarity[i] * w for i, w in zip(idxs, weights)])
-    avg_sim = np.mean(sims, axis=0)
-    return avg_sim.astype(np.float32)
+def click_profile(clicked_ids: list[int]) -> np.ndarray | None:
+    """User profile vector in embedding space (None when no click is in the model)."""
+    idxs, weights = _click_weights(clicked_ids)
+    if not len(idxs):
+        return None
+    return weights @ get_model().embeddings[idxs]
+
+def _content_profile_sim(clicked_ids: list[int]) -> np.ndarray:
+    """Cosine of every game to the click profile → 1D score per game."""
+    profile = click_profile(clicked_ids)
+    if profile is None:
+        return np.zeros(len(get_model()), dtype=np.float32)
+    return (get_model().embeddings @ profile).astype(np.float32)
 
 def _enrich_with_details(games: list[dict]) -> list[dict]:
     if not games:
         return games
 
-    ids = [g["id"] for g in games if "id" in g]
-    db_games = {g.id: g for g in Game.query.filter(Game.id.in_(ids)).all()}
-
+    details = get_game_details([game["id"] for game in games if "id" in game])
     return [
-        {**g, **db_games[g["id"]].to_dict()} if g["id"] in db_games else g
-        for g in games
+        {**game, **details[game["id"]]} if details.get(game["id"]) else game
+        for game in games
     ]
 
 
 
 
+def _rated_rows(user_ratings: dict, weight=1.0) -> tuple[list[int], list[float]]:
+    """(rows, boosts) of the rated games in the model; ratings 1–5 map to -1..+1 times `weight`."""
+    rated = list(user_ratings.items())
+    rows = _index_of([int(gid) for gid, _ in rated])
+    idxs, norms = [], []
+    for idx, (_, rating) in zip(rows, rated):
+        if idx < 0:
+            continue
+        idxs.append(int(idx))
+        # normalize rating (1–5 → -1 to +1)
+        norms.append((rating - 3) / 2.0 * weight)
+    return idxs, norms
+
+
 def _rating_boost_vector(user_ratings: dict, weight=1.0):
     """Turn user ratings into weighted score boosts."""
-    boost = np.zeros(len(df), dtype=np.float32)
     if not user_ratings:
-        return boost
+        return np.zeros(len(get_model()), dtype=np.float32)
 
-    for gid, rating in user_ratings.items():
-        if int(gid) not in ID_TO_INDEX:
-            continue
-        idx = ID_TO_INDEX[int(gid)]
-        # normalize rating (1–5 → -1 to +1)
-        norm = (rating - 3) / 2.0
-        boost += norm * similarity[idx] * weight
-    return boost
+    idxs, norms = _rated_rows(user_ratings, weight)
+    if not idxs:
+        return np.zeros(len(get_model()), dtype=np.float32)
+    return _scatter_neighbors(idxs, norms)
+
+
+# ---- Candidate generation ----
+# Past RETRIEVAL_MIN_GAMES the hybrid ranker works in two stages: stage one
+# gathers candidates (every game of the `probe_clusters` KMeans clusters whose
+# centroids are closest to the click profile, the most popular games, the
+# franchises of played games and the neighbours of rated games), stage two
+# scores only those exactly. Every boost except content similarity is zero
+# outside that set, so what can be missed is content matches in unprobed
+# clusters; more clusters trade latency for recall (scripts/bench_retrieval.py).
+RETRIEVAL_MIN_GAMES = int(os.getenv("RETRIEVAL_MIN_GAMES", 50000))
+RETRIEVAL_CLUSTERS = int(os.getenv("RETRIEVAL_CLUSTERS", 3))
+POPULAR_CANDIDATES = 500
+
+class _RetrievalIndex(NamedTuple):
+    centroids: np.ndarray          # [n_clusters, dim] unit-length mean embedding of each cluster
+    cluster_slices: list           # per cluster, slice(start, stop) when its rows are contiguous, else None
+    franchise_rows: np.ndarray     # rows grouped by franchise code ...
+    franchise_offsets: np.ndarray  # ... code f is franchise_rows[franchise_offsets[f]:franchise_offsets[f + 1]]
+    popular: np.ndarray            # rows of the POPULAR_CANDIDATES most popular games
+
+def _grouped(labels: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    labels = np.asarray(labels)
+    rows = np.argsort(labels, kind="stable")
+    offsets = np.zeros(int(labels.max()) + 2, dtype=np.int64)
+    np.cumsum(np.bincount(labels), out=offsets[1:])
+    return rows, offsets
+
+# Keyed on the model object, like _ann_index.
+@lru_cache(maxsize=1)
+def _retrieval_index(model: ModelArtifact) -> _RetrievalIndex:
+    cluster_rows, cluster_offsets = _grouped(model.cluster)
+    centroids = np.zeros((len(cluster_offsets) - 1, model.embeddings.shape[1]), dtype=np.float32)
+    slices = []
+    for c in range(len(centroids)):
+        members = cluster_rows[cluster_offsets[c]:cluster_offsets[c + 1]]
+        contiguous = len(members) and members[-1] - members[0] == len(members) - 1
+        # ml.py stores rows grouped by cluster; rows appended by incremental updates are not
+        slices.append(slice(int(members[0]), int(members[-1]) + 1) if contiguous else None)
+        if len(members):
+            centroids[c] = model.embeddings[members].mean(axis=0)
+    centroids /= np.linalg.norm(centroids, axis=1, keepdims=True) + 1e-12
+    franchise_rows, franchise_offsets = _grouped(model.franchise)
+    popular = top_n(_popularity_scores(model), POPULAR_CANDIDATES)
+    return _RetrievalIndex(centroids, slices, franchise_rows, franchise_offsets, popular)
+
+def _candidate_rows(model, profile, played: np.ndarray, rated: list[int], probe_clusters: int):
+    """
+    (sorted rows worth scoring exactly, contiguous slices among them) - see the
+    section comment. Rows are collected in a catalog-sized mask: one linear pass
+    is cheaper than sorting tens of thousands of candidate ids.
+    """
+    index = _retrieval_index(model)
+    mask = np.zeros(len(model), dtype=bool)
+    slices = []
+    if profile is not None:
+        probed = top_n(index.centroids @ profile, probe_clusters)
+        for c in probed:
+            if index.cluster_slices[c] is not None:
+                slices.append(index.cluster_slices[c])
+                mask[index.cluster_slices[c]] = True
+        loose = [c for c in probed if index.cluster_slices[c] is None]
+        if loose:
+            mask |= np.isin(model.cluster, loose)
+    mask[index.popular] = True
+    mask[played] = True
+    mask[np.asarray(model.neighbor_idx[rated]).ravel()] = True
+    for code in np.unique(model.franchise[played]):
+        mask[index.franchise_rows[index.franchise_offsets[code]:index.franchise_offsets[code + 1]]] = True
+    return np.flatnonzero(mask), slices
+
+def _content_scores(model, rows: np.ndarray, slices: list, profile) -> np.ndarray:
+    """Cosine to `profile` of each of `rows`; slices are scored in place, the rest gathered."""
+    out = np.empty(len(rows), dtype=np.float32)
+    covered = np.zeros(len(rows), dtype=bool)
+    for sl in slices:
+        start = int(np.searchsorted(rows, sl.start))
+        out[start:start + sl.stop - sl.start] = model.embeddings[sl] @ profile
+        covered[start:start + sl.stop - sl.start] = True
+    rest = np.flatnonzero(~covered)
+    if len(rest):
+        out[rest] = model.embeddings[rows[rest]] @ profile
+    return out
+
+def _candidate_scores(model, rows, slices, profile, played, rated, norms, w_content, w_franchise, w_pop, w_rating):
+    """Hybrid score of each of `rows` (sorted), same terms as the full-catalog path."""
+    s_content = (
+        _content_scores(model, rows, slices, profile) if profile is not None
+        else np.zeros(len(rows), dtype=np.float32)
+    )
+    codes = np.unique(model.franchise[played])
+    s_franchise = np.isin(model.franchise[rows], codes).astype(np.float32)
+    s_pop = _pop_scores()[rows]
+    s_rating = np.zeros(len(rows), dtype=np.float32)
+    if rated:
+        # every neighbour of a rated game is a candidate, so it has a position in `rows`
+        nbr_rows = np.asarray(model.neighbor_idx[rated]).ravel()
+        vals = (model.neighbor_scores[rated] * np.asarray(norms, dtype=np.float32)[:, None]).ravel()
+        s_rating = np.bincount(np.searchsorted(rows, nbr_rows), weights=vals, minlength=len(rows)).astype(np.float32)
 
+    score = w_content * s_content + w_franchise * s_franchise + w_pop * s_pop + w_rating * s_rating
+    if len(played):
+        score[np.searchsorted(rows, played)] *= 0.3
+    return score
 
-def hybrid_recommend(
-    clicked_ids: list[int] | None,
-    played_ids: list[int] | None,
-    user_ratings: dict[str:int] | None,
+
+def _hybrid_rank(
+    clicked_ids: list[int],
+    played_ids: list[int],
+    user_ratings: dict,
     n=60,
     w_content=0.5,
     w_franchise=0.2,
     w_pop=0.1,
     w_rating=0.2,
     diversify=True,
-):
-    clicked_ids = clicked_ids or []
-    played_ids = played_ids or []
-    user_ratings = user_ratings or {}
+    probe_clusters: int | None = None,
+) -> np.ndarray:
+    """Rows of the top `n` hybrid recommendations (see `hybrid_recommend`)."""
+    model = get_model()
+    if probe_clusters is None and len(model) > RETRIEVAL_MIN_GAMES:
+        probe_clusters = RETRIEVAL_CLUSTERS
+
+    if probe_clusters is not None:
+        profile = click_profile(clicked_ids)
+        played = _index_of(played_ids)
+        played = np.unique(played[played >= 0])
+        rated, norms = _rated_rows(user_ratings, weight=1.0)
+        rows, slices = _candidate_rows(model, profile, played, rated, probe_clusters)
+        score = _candidate_scores(
+            model, rows, slices, profile, played, rated, norms, w_content, w_franchise, w_pop, w_rating,
+        )
+        if diversify:
+            return rows[top_n_diverse(score, n, model.franchise[rows], limit=3)]
+        return rows[top_n(score, n)]
 
     # Scores
     s_content = _content_profile_sim(clicked_ids)
     s_franchise = _franchise_boost_vector(played_ids, weight=1.0)
-    s_pop = POP_SCORES
+    s_pop = _pop_scores()
     s_rating = _rating_boost_vector(user_ratings, weight=1.0)
 
     # Weighted sum
     score = w_content * s_content + w_franchise * s_franchise + w_pop * s_pop + w_rating * s_rating
 
-    # Exclude games the user already marked as played
-    mask_excl = np.ones(len(df), dtype=bool)
+    # Damp games the user already marked as played
     if played_ids:
-        for pid in played_ids:
-            if pid in ID_TO_INDEX:
-                idx = ID_TO_INDEX[pid]
-                score[idx] *= 0.3
-
-    # Rank
-    order = np.argsort(-score)
-    order = [i for i in order if mask_excl[i]]
+        played = _index_of(played_ids)
+        score[played[played >= 0]] *= 0.3
 
-    # Optional: diversify by limiting per-franchise count
+    # Rank; optionally diversify by limiting per-franchise count
     if diversify:
-        taken, out, limit = set(), [], 3
-        for i in order:
-            row = df.iloc[i]
-            key = extract_franchise_key(row["name"], row.get("slug", ""))
-            cnt = sum(1 for j in out if extract_franchise_key(df.iloc[j]["name"], df.iloc[j].get("slug", "")) == key)
-            if cnt < limit:
-                out.append(i)
-            if len(out) >= n:
-                break
-        final = out
-    else:
-        final = order[:n]
-
+        return top_n_diverse(score, n, model.franchise, limit=3)
+    return top_n(score, n)
 
-    return _enrich_with_details(df.iloc[final].to_dict(orient="records"))
 
+def hybrid_recommend(
+    clicked_ids: list[int] | None,
+    played_ids: list[int] | None,
+    user_ratings: dict[str:int] | None,
+    n=60,
+    w_content=0.5,
+    w_franchise=0.2,
+    w_pop=0.1,
+    w_rating=0.2,
+    diversify=True,
+    probe_clusters: int | None = None,
+):
+    """
+    Top `n` games for a user's clicks, played games and ratings.
+    Catalogs past RETRIEVAL_MIN_GAMES score only a candidate set drawn from the
+    `probe_clusters` (default RETRIEVAL_CLUSTERS) closest clusters; passing
+    `probe_clusters` forces that mode at any size.
+    """
+    final = _hybrid_rank(
+        clicked_ids or [], played_ids or [], user_ratings or {}, n,
+        w_content, w_franchise, w_pop, w_rating, diversify, probe_clusters,
+    )
+    return _enrich_with_details(_records(final))
+
+
+# ---- Game details ----
+# Request-scoped identity map in flask.g: every game is serialized at most once
+# per request. Misses are served by the process-wide game_store, and only ids it
+# has never seen are fetched, all with a single IN query.
+def _details_map() -> dict:
+    if "game_details" not in g:
+        g.game_details = {}
+    return g.game_details
+
+def prime_game_details(games: list[Game]):
+    """Seed the request's identity map with Game rows that are already loaded."""
+    memo = _details_map()
+    for game in games:
+        memo.setdefault(game.id, game.to_dict())
+
+def get_game_details(game_ids: list[int]) -> dict[int, dict]:
+    """{game_id: detail dict} for `game_ids` ({} for unknown ids), one query at most."""
+    memo = _details_map()
+    missing = {int(gid) for gid in game_ids} - memo.keys()
+    if missing:
+        memo.update(game_store.get_many(missing))
+        missing -= memo.keys()
+    if missing:
+        for game in Game.query.filter(Game.id.in_(missing)).all():
+            memo[game.id] = game.to_dict()
+        for gid in missing:
+            memo.setdefault(gid, {})
+    return {int(gid): memo[int(gid)] for gid in game_ids}
 
 def get_game_detail(game_id: int) -> dict:
-    game = Game.query.get(game_id)
-    return game.to_dict() if game else {}
-
+    return get_game_details([game_id])[int(game_id)]
@@ -1,8 +1,11 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required
 from app.utils import role_required
 from app.extensions import db
 from app.models import User
+from app.caching import cache_stats
+from app.recommender.click_log import click_log
+from app.recommender.interactions import load_profiles
 
 bp = Blueprint("admin", __name__, url_prefix="/admin")
 
@@ -11,7 +14,16 @@ bp = Blueprint("admin", __name__, url_prefix="/admin")
 @role_required("admin")
 def dashboard():
     users = User.query.all()
-    return render_template("admin/dashboard.html", users=users)
+    profiles = load_profiles([user.id for user in users], max_clicks=0)
+    played = {user_id: profile.played for user_id, profile in profiles.items()}
+    return render_template("admin/dashboard.html", users=users, played=played)
+
+@bp.route("/stats")
+@login_required
+@role_required("admin")
+def stats():
+    # counters are per worker process: each request reports the worker that served it
+    return jsonify(cache=cache_stats(), click_log=click_log.stats())
 
 @bp.route("/set_role/<int:user_id>", methods=["POST"])
 @login_required
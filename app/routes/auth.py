@@ -2,7 +2,8 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required, current_user
 from app.extensions import db, bcrypt
 from app.models import User
-from app.recommender import get_game_detail
+from app.recommender import get_game_details
+from app.recommender import interactions
 from werkzeug.utils import secure_filename
 import os
 
@@ -57,8 +58,9 @@ def profile():
     playlists = []
 
     if section == "played":
-        played_ids = current_user.played or []  # make sure played is stored in DB as JSON/array
-        played_games = [get_game_detail(pid) for pid in played_ids if get_game_detail(pid)]
+        played_ids = interactions.played_games(current_user.id)
+        details = get_game_details(played_ids)
+        played_games = [details[pid] for pid in played_ids if details[pid]]
 
     if section == "playlist":
         playlists = current_user.playlists
@@ -1,34 +1,65 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session, make_response
 from flask_login import login_required, current_user
-from app.extensions import db, cache
+from app.extensions import db
 from app.recommender import (
     get_diverse_feed, hybrid_recommend, recommend_similar_games, get_game_detail
 )
+from app.recommender import interactions
+from app.recommender.click_log import click_log
+from app.models import User
+from app.caching import cache_get, cache_set, invalidate
 import json
+import os
 
 bp = Blueprint("main", __name__)
 
+# Per-user feeds are keyed on (user id, User.feed_version): an entry stays valid
+# until the user's clicked/played/ratings change, which bumps the version.
+FEED_NAMESPACE = "user_feed"
+FEED_CACHE_TTL = int(os.getenv("FEED_CACHE_TTL", 1800))
+ANON_FEED_NAMESPACE = "anon_feed"
 
 
-@cache.cached(timeout=600, key_prefix="anon_feed")
 def get_anon_feed():
-    return get_diverse_feed(n=60)
+    recs = cache_get(ANON_FEED_NAMESPACE, "default")
+    if recs is None:
+        recs = get_diverse_feed(n=60)
+        cache_set(ANON_FEED_NAMESPACE, "default", recs, timeout=600)
+    return recs
+
+def _bump_feed_version():
+    """Mark the current user's signals as changed (caller commits)."""
+    old = current_user.feed_version or 0
+    # incremented in SQL: the click log's writer thread bumps it concurrently
+    current_user.feed_version = User.feed_version + 1
+    invalidate(FEED_NAMESPACE, f"{current_user.id}:{old}")
+
+def _user_feed():
+    """Feed of the current user, or None when they have no clicks or played games yet."""
+    key = f"{current_user.id}:{current_user.feed_version or 0}"
+    recs = cache_get(FEED_NAMESPACE, key)
+    if recs is None:
+        profile = interactions.load_profile(current_user.id)
+        if not (profile.clicked or profile.played):
+            return None
+        recs = hybrid_recommend(clicked_ids=profile.clicked, played_ids=profile.played,
+                                user_ratings=profile.ratings, n=40)
+        cache_set(FEED_NAMESPACE, key, recs, timeout=FEED_CACHE_TTL)
+    return recs
 
 def set_rating(game_id: int, rating: int):
     """Set or update a rating for the current user."""
-    ratings = dict(_get_user_list("ratings"))
-    ratings[str(game_id)] = rating
-    setattr(current_user, "ratings", ratings)
+    if get_rating(game_id) == rating:
+        return
+    interactions.add_rating(current_user.id, game_id, rating)
+    _bump_feed_version()
     db.session.commit()
 
 def get_rating(game_id: int) -> int:
     """Get rating if exists, else None."""
-    ratings = dict(_get_user_list("ratings"))
-    rating = None
-    try:
-        rating = ratings[str(game_id)]
-    finally:
-        return rating
+    if not current_user.is_authenticated:
+        return None
+    return interactions.get_rating(current_user.id, game_id)
 
 def _get_cookie_list(key):
     raw = request.cookies.get(key)
@@ -43,25 +74,9 @@ def _set_cookie_list(resp, key, value_list):
     resp.set_cookie(key, json.dumps(value_list), max_age=60*60*24*7)  # 7 days
     return resp
 
-def _get_user_list(key):
-    if not current_user.is_authenticated:
-        return []
-    return getattr(current_user, key) or []
-
-def _push_user_unique(key, value):
-    if not current_user.is_authenticated:
-        return
-    arr = set(getattr(current_user, key) or [])
-    arr.add(value)
-    setattr(current_user, key, list(arr))
-    db.session.commit()
-
-def _pop_user_unique(key, value):
-    if not current_user.is_authenticated:
-        return
-    arr = set(getattr(current_user, key) or [])
-    arr.remove(value)
-    setattr(current_user, key, list(arr))
+def _set_played(game_id, played):
+    interactions.set_played(current_user.id, game_id, played)
+    _bump_feed_version()
     db.session.commit()
 
 
@@ -72,20 +87,18 @@ def index():
 
 @bp.route("/feed")
 def feed():
-    clicked = []
+    recs = None
     played = []
-    ratings = []
 
     if current_user.is_authenticated:
-        clicked = _get_user_list("clicked")
-        played = _get_user_list("played")
-        ratings = _get_user_list("ratings")
+        recs = _user_feed()
+        played = interactions.played_games(current_user.id)
     else:
         clicked = _get_cookie_list("clicked")
+        if clicked:
+            recs = hybrid_recommend(clicked_ids=clicked, played_ids=[], user_ratings={}, n=40)
 
-    if clicked or played:
-        recs = hybrid_recommend(clicked_ids=clicked, played_ids=played, user_ratings=ratings, n=40)
-    else:
+    if recs is None:
         # fallback → diverse popular feed across genres
         recs = get_anon_feed()
 
@@ -101,10 +114,8 @@ def game_detail(game_id):
         return redirect(url_for("main.feed"))
 
     if current_user.is_authenticated:
-        _push_user_unique("clicked", game_id)
-        played_list = _get_user_list("played")
-        ratings=_get_user_list("ratings")
-        is_played = game_id in played_list
+        click_log.record(current_user.id, game_id)  # written behind the response, see click_log.py
+        is_played = interactions.is_played(current_user.id, game_id)
     else:
         clicked = set(_get_cookie_list("clicked"))
         clicked.add(game_id)
@@ -120,21 +131,8 @@ def game_detail(game_id):
 @bp.route("/mark_played/<int:game_id>", methods=["POST"])
 @login_required
 def mark_played(game_id):
-    played = set(_get_user_list("played"))
-    if game_id in played:
-        _pop_user_unique("played", game_id)
-    else:
-        # toggle ON → add to played
-        _push_user_unique("played", game_id)
-        # optional: remove from clicked so it doesn’t affect recs
-        clicked = set(_get_user_list("clicked"))
-        if game_id in clicked:
-            clicked.remove(game_id)
-            session["clicked"] = list(clicked)
-
-    # _push_user_unique("played", played)
-    session["played"] = list(played)
-
+    # toggle: played -> unplayed, anything else -> played
+    _set_played(game_id, not interactions.is_played(current_user.id, game_id))
     return redirect(request.referrer or url_for("auth.login"))
 
 
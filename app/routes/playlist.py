@@ -2,14 +2,33 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from flask_login import login_required, current_user
 from app import db
 from app.models import ToPlayList, Game, playlist_games
-from app.recommender import optimize_play_order, get_game_detail
-from app.utils import get_cached_order, set_cached_order
-from app.utils import _CACHE
+from app.recommender import optimize_play_order, get_game_details, prime_game_details
+from app.utils import get_cached_order, set_cached_order, invalidate_cached_orders
 
 
 bp = Blueprint("playlist", __name__, url_prefix="/playlist")
 
 
+def _save_positions(playlist_id, moved):
+    """Write (game_id, position) pairs of one playlist."""
+    if db.session.get_bind().dialect.name == "postgresql":
+        # one UPDATE ... FROM (VALUES ...) statement; psycopg2 would run an
+        # executemany UPDATE as one round trip per row
+        rows = db.values(db.column("gid", db.Integer), db.column("pos", db.Integer), name="moved").data(moved)
+        db.session.execute(
+            playlist_games.update()
+            .where(playlist_games.c.playlist_id == playlist_id, playlist_games.c.game_id == rows.c.gid)
+            .values(position=rows.c.pos)
+        )
+        return
+    db.session.execute(
+        playlist_games.update()
+        .where(playlist_games.c.playlist_id == playlist_id, playlist_games.c.game_id == db.bindparam("gid"))
+        .values(position=db.bindparam("pos")),
+        [{"gid": gid, "pos": pos} for gid, pos in moved],
+    )
+
+
 @bp.route("/playlist/<int:playlist_id>/reorder", methods=["POST"])
 @login_required
 def reorder_playlist(playlist_id):
@@ -20,21 +39,28 @@ def reorder_playlist(playlist_id):
     new_order = request.json.get("order", [])
     if not new_order:
         return {"status": "error"}, 400
-
-    # Save positions in DB
-    for idx, game_id in enumerate(new_order):
-        db.session.execute(
-            playlist_games.update()
-            .where(
-                (playlist_games.c.playlist_id == playlist_id) &
-                (playlist_games.c.game_id == int(game_id))
-            )
-            .values(position=idx)
-        )
-    db.session.commit()
+    try:
+        new_order = [int(gid) for gid in new_order]
+    except (TypeError, ValueError):
+        return {"status": "error", "message": "order must list game ids"}, 400
+
+    # The submitted order must be a permutation of the playlist's games
+    positions = dict(db.session.execute(
+        db.select(playlist_games.c.game_id, playlist_games.c.position)
+        .where(playlist_games.c.playlist_id == playlist_id)
+    ).all())
+    if len(new_order) != len(positions) or set(new_order) != positions.keys():
+        return {"status": "error", "message": "order does not match the playlist's games"}, 400
+
+    # Save positions in DB: only the rows that actually moved, so a drag costs
+    # the span it shifted rather than the playlist length
+    moved = [(gid, idx) for idx, gid in enumerate(new_order) if positions[gid] != idx]
+    if moved:
+        _save_positions(playlist_id, moved)
+        db.session.commit()
 
     # Update cache
-    set_cached_order(playlist.id, [int(gid) for gid in new_order], "custom", [int(gid) for gid in new_order])
+    set_cached_order(playlist.id, new_order, "custom", new_order)
     return {"status": "success"}
 
 
@@ -55,7 +81,9 @@ def view(playlist_id):
     if playlist.user_id != current_user.id:
         abort(403)
 
+    prime_game_details(playlist.games)  # rows are loaded anyway; later lookups hit memory
     game_ids = [g.id for g in playlist.games]
+    details = get_game_details(game_ids)
     order = session.get("playlist_order", "alpha")  # default to alpha
 
     # If custom, check cache first, then DB
@@ -83,18 +111,19 @@ def view(playlist_id):
             ordered_ids = cached
         else:
             if order == "alpha":
-                ordered_ids = sorted(game_ids, key=lambda g: get_game_detail(g)['name'].lower())
+                ordered_ids = sorted(game_ids, key=lambda g: (details[g].get('name') or "").lower())
             elif order == "release":
-                ordered_ids = sorted(game_ids, key=lambda g: get_game_detail(g)['released'] or "9999-12-31")
+                ordered_ids = sorted(game_ids, key=lambda g: str(details[g].get('released') or "9999-12-31"))
             elif order == "playtime":
-                ordered_ids = sorted(game_ids, key=lambda g: get_game_detail(g)['playtime'] or 0)
+                ordered_ids = sorted(game_ids, key=lambda g: details[g].get('playtime') or 0)
             elif order == "special":
                 ordered_ids = optimize_play_order(game_ids)
             else:
                 ordered_ids = game_ids
             set_cached_order(playlist.id, game_ids, order, ordered_ids)
 
-    ordered_games = [get_game_detail(gid) for gid in ordered_ids]
+    details = get_game_details(ordered_ids)  # no query unless the cached order names new ids
+    ordered_games = [details[gid] for gid in ordered_ids]
     return render_template("playlist.html", playlist=playlist, games=ordered_games, order=order)
 
 
@@ -128,13 +157,12 @@ def delete(playlist_id):
         return redirect(url_for("main.feed"))
     db.session.delete(playlist)
     db.session.commit()
+    invalidate_playlist_cache(playlist_id)
     flash("Playlist deleted.", "info")
     return redirect(url_for("auth.profile", section="playlist"))
 
 def invalidate_playlist_cache(playlist_id):
-    keys_to_delete = [k for k in _CACHE if k.startswith(str(playlist_id))]
-    for k in keys_to_delete:
-        _CACHE.pop(k, None)
+    invalidate_cached_orders(int(playlist_id))
 
 
 @bp.route("/remove/<int:playlist_id>/<int:game_id>", methods=["POST"])
@@ -169,11 +197,12 @@ def add_game(game_id):
         db.session.add(game)
     # Existing playlists selected
     selected_ids = request.form.getlist("playlists")
+    changed = []
     for pid in selected_ids:
         pl = ToPlayList.query.filter_by(id=pid, user_id=current_user.id).first()
         if pl and game not in pl.games:
             pl.games.append(game)
-        # invalidate_playlist_cache(pid)
+            changed.append(pl.id)
 
     # New playlist creation
     new_name = request.form.get("new_name", "").strip()
@@ -188,8 +217,11 @@ def add_game(game_id):
             # if playlist already exists, just add game to it
             if game not in existing.games:
                 existing.games.append(game)
+                changed.append(existing.id)
 
     db.session.commit()
+    for pid in changed:
+        invalidate_playlist_cache(pid)
 
     # redirect back to the game page
     return redirect(request.referrer or url_for("auth.profile", section="playlist"))
@@ -1,24 +1,38 @@
 from functools import wraps, lru_cache
 from flask import abort
 from flask_login import current_user
+from app.caching import cache_get, cache_set, invalidate
 import hashlib
 from urllib.parse import quote
 
-def _hash_playlist(playlist_id: int, game_ids: list[int], order_type: str) -> str:
-    """Return a stable key from playlist id + its games + order type."""
-    raw = f"{playlist_id}:{sorted(game_ids)}:{order_type}"
-    return hashlib.md5(raw.encode("utf-8")).hexdigest()
+# Playlist orders, shared across workers through app.caching.
+# One entry per playlist: {"members": <hash of its game ids>, "orders": {order_type: [ids]}},
+# so invalidating a playlist is a single delete.
+ORDER_NAMESPACE = "playlist_order"
+ORDER_TYPES = {"alpha", "release", "playtime", "special", "custom"}
 
-# Simple in-memory cache (per process)
-_CACHE = {}
+def _members_key(game_ids: list[int]) -> str:
+    """Stable fingerprint of a playlist's membership (order-independent)."""
+    return hashlib.md5(",".join(map(str, sorted(game_ids))).encode("utf-8")).hexdigest()
 
 def get_cached_order(playlist_id: int, game_ids: list[int], order_type: str):
-    key = _hash_playlist(playlist_id, game_ids, order_type)
-    return _CACHE.get(key)
+    entry = cache_get(ORDER_NAMESPACE, playlist_id)
+    if not entry or entry["members"] != _members_key(game_ids):
+        return None  # membership changed behind our back → treat as a miss
+    return entry["orders"].get(order_type)
 
 def set_cached_order(playlist_id: int, game_ids: list[int], order_type: str, order: list[int]):
-    key = _hash_playlist(playlist_id, game_ids, order_type)
-    _CACHE[key] = order
+    if order_type not in ORDER_TYPES:
+        return
+    members = _members_key(game_ids)
+    entry = cache_get(ORDER_NAMESPACE, playlist_id)
+    if not entry or entry["members"] != members:
+        entry = {"members": members, "orders": {}}
+    entry["orders"][order_type] = order
+    cache_set(ORDER_NAMESPACE, playlist_id, entry)
+
+def invalidate_cached_orders(playlist_id: int):
+    invalidate(ORDER_NAMESPACE, playlist_id)
 
 
 # custom Placeholder fetched from placehold.co
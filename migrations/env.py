@@ -20,7 +20,7 @@ fileConfig(config.config_file_name)
 config.set_main_option('sqlalchemy.url', os.getenv('DATABASE_URL'))
 
 # target_metadata for autogenerate
-app = create_app()
+app = create_app(require_model=False)
 target_metadata = db.Model.metadata
 
 def run_migrations_offline():
@@ -0,0 +1,71 @@
+"""Normalize game.screenshots to native JSON arrays
+
+data_collection.py used to store json.dumps(list) in the JSON column, so rows
+hold a JSON *string* that Game.to_dict then eval()'d on every serialization.
+Decode those (and any Python-repr lists) once, here, into real arrays.
+The column itself was never part of the migration chain, so add it where missing.
+
+Revision ID: 7c4e2a9d1f35
+Revises: 3b9f1c2d7a10
+Create Date: 2026-10-18 10:02:17.884310
+
+"""
+import ast
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c4e2a9d1f35'
+down_revision: Union[str, Sequence[str], None] = '3b9f1c2d7a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+game = sa.table('game', sa.column('id', sa.Integer), sa.column('screenshots', sa.JSON))
+
+
+def _decode(value):
+    """Unwrap string-encoded lists until a list (or None) is left; a plain string becomes [string]."""
+    while isinstance(value, str):
+        text = value.strip()
+        if not text:
+            return None
+        try:
+            value = json.loads(text)
+        except ValueError:
+            try:
+                value = ast.literal_eval(text)  # str(list) repr written by older scripts
+            except (ValueError, SyntaxError):
+                return [text]  # a bare URL or other plain string
+    if value is None or isinstance(value, list):
+        return value
+    return [value]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    conn = op.get_bind()
+    if 'screenshots' not in {c['name'] for c in sa.inspect(conn).get_columns('game')}:
+        op.add_column('game', sa.Column('screenshots', sa.JSON(), nullable=True))
+        return
+    rows = conn.execute(sa.select(game.c.id, game.c.screenshots).where(game.c.screenshots.isnot(None)))
+    updates = [
+        {"gid": gid, "screenshots": _decode(shots)}
+        for gid, shots in rows
+        if isinstance(shots, str)
+    ]
+    if updates:
+        conn.execute(
+            game.update().where(game.c.id == sa.bindparam("gid")).values(screenshots=sa.bindparam("screenshots")),
+            updates,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Arrays are what the old eval(str(...)) serializer produced anyway, and the
+    # column may predate this revision, so leave both in place.
+    pass
@@ -0,0 +1,29 @@
+"""Index playlist_games on (playlist_id, position)
+
+Revision ID: a52e8d0c4f19
+Revises: 7c4e2a9d1f35
+Create Date: 2026-10-18 14:36:05.219843
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a52e8d0c4f19'
+down_revision: Union[str, Sequence[str], None] = '7c4e2a9d1f35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('playlist_games', schema=None) as batch_op:
+        batch_op.create_index('ix_playlist_games_playlist_id_position', ['playlist_id', 'position'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('playlist_games', schema=None) as batch_op:
+        batch_op.drop_index('ix_playlist_games_playlist_id_position')
@@ -0,0 +1,132 @@
+"""Move user.clicked/played/ratings into user_interaction and user_rating
+
+The JSON/pickle columns were rewritten whole on every click, played toggle
+and rating. Each signal becomes one row of an append-only table instead;
+existing lists are copied over (as of now, in their stored order) and the
+columns dropped. Downgrade folds the tables back into the columns.
+
+Revision ID: e3b7c91d5a06
+Revises: a52e8d0c4f19
+Create Date: 2026-10-18 15:21:48.730562
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b7c91d5a06'
+down_revision: Union[str, Sequence[str], None] = 'a52e8d0c4f19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+user = sa.table(
+    'user', sa.column('id', sa.Integer), sa.column('clicked', sa.JSON),
+    sa.column('played', sa.JSON), sa.column('ratings', sa.PickleType),
+)
+interaction = sa.table(
+    'user_interaction', sa.column('id', sa.Integer), sa.column('user_id', sa.Integer),
+    sa.column('game_id', sa.Integer), sa.column('kind', sa.String), sa.column('created_at', sa.DateTime),
+)
+rating = sa.table(
+    'user_rating', sa.column('id', sa.Integer), sa.column('user_id', sa.Integer),
+    sa.column('game_id', sa.Integer), sa.column('rating', sa.Integer), sa.column('created_at', sa.DateTime),
+)
+CHUNK = 5000
+
+
+def _insert(conn, table, rows):
+    for start in range(0, len(rows), CHUNK):
+        conn.execute(table.insert(), rows[start:start + CHUNK])
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_interaction',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('game_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=16), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_user_interaction_user_kind_id', 'user_interaction', ['user_id', 'kind', 'id'], unique=False)
+    op.create_index('ix_user_interaction_game_user', 'user_interaction', ['game_id', 'user_id'], unique=False)
+    op.create_table('user_rating',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('game_id', sa.Integer(), nullable=False),
+    sa.Column('rating', sa.SmallInteger(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_user_rating_user_game_id', 'user_rating', ['user_id', 'game_id', 'id'], unique=False)
+
+    conn = op.get_bind()
+    now = datetime.now()
+    events, ratings = [], []
+    for user_id, clicked, played, user_ratings in conn.execute(
+        sa.select(user.c.id, user.c.clicked, user.c.played, user.c.ratings).order_by(user.c.id)
+    ):
+        for kind, game_ids in (('click', clicked), ('played', played)):
+            events.extend(
+                {'user_id': user_id, 'game_id': int(gid), 'kind': kind, 'created_at': now}
+                for gid in dict.fromkeys(game_ids or [])
+            )
+        ratings.extend(
+            {'user_id': user_id, 'game_id': int(gid), 'rating': int(value), 'created_at': now}
+            for gid, value in (user_ratings or {}).items()
+        )
+    _insert(conn, interaction, events)
+    _insert(conn, rating, ratings)
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('ratings')
+        batch_op.drop_column('played')
+        batch_op.drop_column('clicked')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('clicked', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('played', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('ratings', sa.PickleType(), nullable=True))
+
+    conn = op.get_bind()
+    users = {}
+    for user_id, game_id, kind in conn.execute(
+        sa.select(interaction.c.user_id, interaction.c.game_id, interaction.c.kind).order_by(interaction.c.id)
+    ):
+        clicked, played, _ = users.setdefault(user_id, ({}, {}, {}))
+        if kind == 'click':
+            clicked[game_id] = None
+        elif kind == 'played':
+            played[game_id] = None
+        else:
+            played.pop(game_id, None)
+    for user_id, game_id, value in conn.execute(
+        sa.select(rating.c.user_id, rating.c.game_id, rating.c.rating).order_by(rating.c.id)
+    ):
+        users.setdefault(user_id, ({}, {}, {}))[2][str(game_id)] = value
+    if users:
+        conn.execute(
+            user.update().where(user.c.id == sa.bindparam('uid')).values(
+                clicked=sa.bindparam('b_clicked'), played=sa.bindparam('b_played'), ratings=sa.bindparam('b_ratings'),
+            ),
+            [
+                {'uid': uid, 'b_clicked': list(clicked), 'b_played': list(played), 'b_ratings': ratings}
+                for uid, (clicked, played, ratings) in users.items()
+            ],
+        )
+
+    op.drop_index('ix_user_rating_user_game_id', table_name='user_rating')
+    op.drop_table('user_rating')
+    op.drop_index('ix_user_interaction_game_user', table_name='user_interaction')
+    op.drop_index('ix_user_interaction_user_kind_id', table_name='user_interaction')
+    op.drop_table('user_interaction')
@@ -0,0 +1,80 @@
+# bench_ann.py
+# Recall@K and latency of the IVF index against exact cosine search, per nprobe,
+# for single queries and for building the top-K neighbour lists.
+#   python -m scripts.bench_ann                       the trained model in MODEL_DIR
+#   python -m scripts.bench_ann --synthetic 200000    clustered random embeddings
+import argparse
+import time
+import numpy as np
+
+from app.recommender.ann import IVFIndex, ivf_neighbor_index
+from app.recommender.artifact import MODEL_DIR, ModelArtifactError, load_model
+from app.recommender.ml import TOP_K
+from app.recommender.ranking import _top_k
+
+
+def synthetic_embeddings(n, dim=103, n_topics=200, spread=1.5, seed=0):
+    """Unit vectors scattered around random topic directions (real embeddings are clustered too)."""
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((n_topics, dim), dtype=np.float32)
+    emb = topics[rng.integers(0, n_topics, n)] + spread * rng.standard_normal((n, dim), dtype=np.float32)
+    return emb / np.linalg.norm(emb, axis=1, keepdims=True)
+
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    return float(np.mean([len(np.intersect1d(f, t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IVF recall@K / latency against exact cosine.")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--synthetic", type=int, default=0, help="use N clustered random embeddings instead")
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--graph", action="store_true", help="also time/score building all top-K lists")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        emb = synthetic_embeddings(args.synthetic)
+        t0 = time.perf_counter()
+        index = IVFIndex.build(emb)
+        print(f"built {index} in {time.perf_counter() - t0:.2f}s")
+    else:
+        model = load_model(args.model_dir)
+        emb = np.asarray(model.embeddings)
+        try:
+            index = IVFIndex.load(args.model_dir)
+        except ModelArtifactError:
+            index = IVFIndex.build(emb)
+        print(f"model {model}, {index}")
+
+    rng = np.random.default_rng(1)
+    queries = rng.choice(len(emb), min(args.queries, len(emb)), replace=False)
+    t0 = time.perf_counter()
+    truth = [_top_k((emb @ emb[q])[None, :], args.k)[0][0] for q in queries]
+    exact_ms = (time.perf_counter() - t0) * 1000 / len(queries)
+
+    print(f"\nsingle queries, recall@{args.k} (exact scan {exact_ms:.3f} ms/query)")
+    print(f"{'nprobe':>7} {'scanned':>8} {'recall':>7} {'ms/query':>9}")
+    for nprobe in args.nprobe:
+        t0 = time.perf_counter()
+        found = [index.query(emb, emb[q], args.k, nprobe)[0] for q in queries]
+        ms = (time.perf_counter() - t0) * 1000 / len(queries)
+        scanned = np.mean([len(index.candidates(emb[q], nprobe)) for q in queries[:50]]) / len(emb)
+        print(f"{nprobe:>7} {scanned:>8.1%} {recall(found, truth):>7.3f} {ms:>9.3f}")
+
+    if args.graph:
+        k = min(TOP_K, len(emb))
+        truth = [_top_k((emb @ emb[q])[None, :], k)[0][0] for q in queries]
+        print(f"\ntop-{k} neighbour lists for all {len(emb)} rows, recall@{k} on sampled rows")
+        print(f"{'nprobe':>7} {'recall':>7} {'seconds':>8}")
+        for nprobe in args.nprobe:
+            t0 = time.perf_counter()
+            idx, _ = ivf_neighbor_index(emb, index, k, nprobe)
+            seconds = time.perf_counter() - t0
+            print(f"{nprobe:>7} {recall(idx[queries], truth):>7.3f} {seconds:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# bench_batch_scoring.py
+# Users/second of the batched hybrid scorer against the trained model in MODEL_DIR.
+#   python -m scripts.bench_batch_scoring [--users 2000] [--threads 1 2 4 8]
+import argparse
+import time
+import numpy as np
+
+from app.recommender.batch import UserProfile, batch_recommend
+from app.recommender.recommender import get_model
+
+
+def random_profiles(ids, n_users, clicks=20, played=5, rated=5, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        UserProfile(
+            rng.choice(ids, clicks).tolist(),
+            rng.choice(ids, played).tolist(),
+            {str(g): int(r) for g, r in zip(rng.choice(ids, rated), rng.integers(1, 6, rated))},
+        )
+        for _ in range(n_users)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched hybrid scoring throughput.")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--n", type=int, default=60)
+    parser.add_argument("--chunk-size", type=int, default=256)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    model = get_model()
+    profiles = random_profiles(np.asarray(model.ids), args.users)
+    print(f"catalog: {len(model)} games, {args.users} users, n={args.n}")
+    print(f"{'chunk':>6} {'threads':>8} {'users/s':>10}")
+
+    # One user per pass is what per-request hybrid_recommend does.
+    sample = profiles[: max(args.users // 10, 1)]
+    t0 = time.perf_counter()
+    batch_recommend(sample, n=args.n, chunk_size=1, threads=1)
+    print(f"{1:>6} {1:>8} {len(sample) / (time.perf_counter() - t0):>10.0f}")
+
+    for threads in args.threads:
+        t0 = time.perf_counter()
+        batch_recommend(profiles, n=args.n, chunk_size=args.chunk_size, threads=threads)
+        rate = args.users / (time.perf_counter() - t0)
+        print(f"{args.chunk_size:>6} {threads:>8} {rate:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# bench_clustering.py
+# Wall time and cluster quality of the training clustering backends on the real
+# feature matrix (X_combined), optionally grown to a larger synthetic catalog by
+# jittered copies of the rows.
+#   python -m scripts.bench_clustering [--source csv] [--scale 10] [--threads 1 4]
+import argparse
+import time
+import numpy as np
+from sklearn.metrics import silhouette_score
+from threadpoolctl import threadpool_limits
+
+from app.recommender.ml import CLUSTER_BACKENDS, fit_transformers, load_catalog, make_clusterer, prepare_features
+
+
+def features(source, scale, seed=0):
+    df, _ = prepare_features(load_catalog(source))
+    _, X = fit_transformers(df)
+    if scale > 1:
+        rng = np.random.default_rng(seed)
+        X = np.vstack([X] + [X + rng.normal(0, 0.05, X.shape) for _ in range(scale - 1)])
+    return X
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KMeans vs MiniBatchKMeans on the training features.")
+    parser.add_argument("--source", choices=("db", "csv"), default="csv")
+    parser.add_argument("--scale", type=int, default=1, help="grow the catalog by this factor")
+    parser.add_argument("--threads", type=int, nargs="+", default=[None])
+    parser.add_argument("--sample", type=int, default=10000, help="rows used for the silhouette score")
+    args = parser.parse_args()
+
+    X = features(args.source, args.scale)
+    print(f"X_combined: {X.shape[0]} rows x {X.shape[1]} features")
+    print(f"{'backend':>10} {'threads':>8} {'seconds':>9} {'inertia':>14} {'silhouette':>11}")
+    for threads in args.threads:
+        for backend in CLUSTER_BACKENDS:
+            with threadpool_limits(limits=threads):
+                model = make_clusterer(backend)
+                t0 = time.perf_counter()
+                labels = model.fit_predict(X)
+                seconds = time.perf_counter() - t0
+            inertia = -model.score(X)  # same definition for both backends: on every row
+            silhouette = silhouette_score(X, labels, sample_size=min(args.sample, len(X)), random_state=0)
+            print(f"{backend:>10} {threads or 'default':>8} {seconds:>9.2f} {inertia:>14.1f} {silhouette:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
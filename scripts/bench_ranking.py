@@ -0,0 +1,59 @@
+# bench_ranking.py
+# Partial top-n selection (app/recommender/ranking.py) vs. the old full argsort.
+#   python -m scripts.bench_ranking [--sizes 10000 100000 500000] [--n 12 40 60]
+import argparse
+import time
+import numpy as np
+
+from app.recommender.ranking import top_n, top_n_diverse
+
+
+def full_sort(scores, n):
+    order = np.argsort(-scores)
+    return [i for i in order][:n]
+
+
+def full_sort_diverse(scores, n, groups, limit=3):
+    counts, out = {}, []
+    for i in np.argsort(-scores).tolist():
+        g = int(groups[i])
+        if counts.get(g, 0) < limit:
+            counts[g] = counts.get(g, 0) + 1
+            out.append(i)
+            if len(out) >= n:
+                break
+    return out
+
+
+def timed(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return float(np.median(samples))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Top-n selection vs. full argsort.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 500_000])
+    parser.add_argument("--n", type=int, nargs="+", default=[12, 40, 60])
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'games':>9} {'n':>4} {'argsort ms':>11} {'top_n ms':>9} {'argsort+div ms':>15} {'top_n_diverse ms':>17}")
+    for size in args.sizes:
+        scores = rng.random(size, dtype=np.float32)
+        groups = rng.integers(0, max(size // 4, 1), size, dtype=np.int32)
+        for n in args.n:
+            assert np.argsort(-scores, kind="stable")[:n].tolist() == top_n(scores, n).tolist()
+            t_full = timed(lambda: full_sort(scores, n), args.repeats)
+            t_top = timed(lambda: top_n(scores, n), args.repeats)
+            t_full_div = timed(lambda: full_sort_diverse(scores, n, groups), args.repeats)
+            t_top_div = timed(lambda: top_n_diverse(scores, n, groups), args.repeats)
+            print(f"{size:>9} {n:>4} {t_full:>11.3f} {t_top:>9.3f} {t_full_div:>15.3f} {t_top_div:>17.3f}")
+
+
+if __name__ == "__main__":
+    main()
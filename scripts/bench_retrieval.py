@@ -0,0 +1,111 @@
+# bench_retrieval.py
+# Latency and recall of cluster-pruned hybrid ranking against full-catalog
+# scoring, on synthetic catalogs larger than today's.
+#   python -m scripts.bench_retrieval [--sizes 100000 500000] [--probe 1 2 3 5 8]
+import argparse
+import tempfile
+import time
+import numpy as np
+
+from app.recommender import recommender
+from app.recommender.artifact import save_model
+
+
+def synthetic_arrays(n, dim=103, k=20, n_clusters=20, n_topics=200, seed=42):
+    """
+    Clustered unit embeddings (games around topic directions, KMeans-like
+    cluster labels from 20 topic groups) with random ratings and franchises.
+    Neighbour lists are drawn from the game's own cluster: the rating scatter
+    costs the same whichever games are listed.
+    """
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((n_topics, dim), dtype=np.float32)
+    topic = rng.integers(0, n_topics, n)
+    emb = topics[topic] + 1.5 * rng.standard_normal((n, dim), dtype=np.float32)
+    emb /= np.linalg.norm(emb, axis=1, keepdims=True)
+    centers = topics[:: n_topics // n_clusters][:n_clusters]
+    cluster = np.empty(n, dtype=np.int32)
+    for start in range(0, n, 65536):
+        cluster[start:start + 65536] = (emb[start:start + 65536] @ centers.T).argmax(axis=1)
+    # ml.py stores rows grouped by cluster
+    order = np.argsort(cluster, kind="stable")
+    emb, topic, cluster = emb[order], topic[order], cluster[order]
+    rows = np.arange(n)
+    members = np.argsort(cluster, kind="stable")
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(cluster, minlength=n_clusters))])
+    sizes = (offsets[1:] - offsets[:-1])[cluster]
+    nbr = members[offsets[cluster][:, None] + (rng.random((n, k)) * sizes[:, None]).astype(np.int64)]
+    nbr[:, 0] = rows
+    return {
+        "ids": rows.astype(np.int64),
+        "id_order": rows.astype(np.int64),
+        "cluster": cluster,
+        "franchise": rng.integers(0, max(n // 4, 1), n).astype(np.int32),
+        "rating": rng.uniform(1, 5, n).astype(np.float32),
+        "metacritic": rng.uniform(40, 99, n).astype(np.float32),
+        "embeddings": emb,
+        "neighbor_idx": nbr.astype(np.int32),
+        "neighbor_scores": np.sort(rng.random((n, k), dtype=np.float32), axis=1)[:, ::-1],
+    }, topic
+
+
+def profiles(topic, n_users, seed=0):
+    """Users whose clicks come from one or two topics, with a few played and rated games."""
+    rng = np.random.default_rng(seed)
+    out = []
+    for _ in range(n_users):
+        liked = rng.choice(np.unique(topic), rng.integers(1, 3), replace=False)
+        pool = np.flatnonzero(np.isin(topic, liked))
+        clicked = rng.choice(pool, 20).tolist()
+        played = rng.choice(pool, 5).tolist()
+        ratings = {str(g): int(r) for g, r in zip(rng.choice(pool, 5), rng.integers(1, 6, 5))}
+        out.append((clicked, played, ratings))
+    return out
+
+
+def timed(users, n, probe):
+    results, samples = [], []
+    for clicked, played, ratings in users:
+        t0 = time.perf_counter()
+        results.append(recommender._hybrid_rank(clicked, played, ratings, n, probe_clusters=probe))
+        samples.append((time.perf_counter() - t0) * 1000)
+    return results, np.median(samples), np.percentile(samples, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cluster-pruned vs full hybrid ranking.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 500_000])
+    parser.add_argument("--probe", type=int, nargs="+", default=[1, 2, 3, 5, 8])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--n", type=int, default=40, help="games per feed (the feed shows 40)")
+    args = parser.parse_args()
+
+    print(f"{'games':>9} {'mode':<10} {'candidates':>10} {'median ms':>10} {'p95 ms':>8} {'recall':>7}")
+    for size in args.sizes:
+        arrays, topic = synthetic_arrays(size)
+        users = profiles(topic, args.users)
+        with tempfile.TemporaryDirectory() as path:
+            save_model(arrays, path=path)
+            del arrays
+            recommender.MODEL_DIR = path
+            recommender.reload_model()
+            model = recommender.get_model()
+            recommender._retrieval_index(model)  # built once per model, not per request
+
+            recommender.RETRIEVAL_MIN_GAMES = size  # keep the default path exact for the baseline
+            exact, med, p95 = timed(users, args.n, None)
+            print(f"{size:>9} {'full':<10} {size:>10} {med:>10.2f} {p95:>8.2f} {1:>7.3f}")
+            for probe in args.probe:
+                found, med, p95 = timed(users, args.n, probe)
+                rec = np.mean([len(np.intersect1d(a, b)) / max(len(a), 1) for a, b in zip(exact, found)])
+                clicked, played, ratings = users[0]
+                cand = len(recommender._candidate_rows(
+                    model, recommender.click_profile(clicked), np.unique(recommender._index_of(played)),
+                    recommender._rated_rows(ratings)[0], probe,
+                )[0])
+                print(f"{size:>9} {f'probe={probe}':<10} {cand:>10} {med:>10.2f} {p95:>8.2f} {rec:>7.3f}")
+            recommender.reload_model()
+
+
+if __name__ == "__main__":
+    main()
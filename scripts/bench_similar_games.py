@@ -0,0 +1,81 @@
+# bench_similar_games.py
+# Latency of the similar-games ranking on synthetic catalogs.
+#   python -m scripts.bench_similar_games [--sizes 10000 100000 500000]
+import argparse
+import time
+import numpy as np
+
+from app.recommender.artifact import ModelArtifact
+from app.recommender.recommender import _similar_indices
+
+
+def synthetic_model(n_games, dim=103, k=100, n_clusters=20, same_cluster_neighbors=True, seed=42):
+    """
+    Random unit embeddings with cluster labels and neighbour lists of the real shape.
+    Exact top-K is O(N²) to build and latency does not depend on which games are
+    listed, so neighbours are drawn at random, either from the game's own cluster
+    (the common case) or from another cluster (forces the exact cluster scan).
+    """
+    rng = np.random.default_rng(seed)
+    emb = rng.standard_normal((n_games, dim), dtype=np.float32)
+    emb /= np.linalg.norm(emb, axis=1, keepdims=True)
+    rows = np.arange(n_games)
+    cluster = (rows % n_clusters).astype(np.int32)
+    target = cluster if same_cluster_neighbors else (cluster + 1) % n_clusters
+    per_cluster = n_games // n_clusters
+    nbr = rng.integers(0, per_cluster, (n_games, k)) * n_clusters + target[:, None]
+    nbr[:, 0] = rows
+    arrays = {
+        "ids": rows.astype(np.int64),
+        "cluster": cluster,
+        "embeddings": emb,
+        "neighbor_idx": nbr.astype(np.int32),
+        "neighbor_scores": np.sort(rng.random((n_games, k), dtype=np.float32), axis=1)[:, ::-1],
+    }
+    return ModelArtifact(None, {"format_version": 0, "n_games": n_games}, arrays)
+
+
+def legacy_similar(model, sims, idx, n):
+    """The pre-neighbour-index path: full argsort, then per-row cluster checks in Python."""
+    order = np.argsort(-sims)
+    c = model.cluster[idx]
+    same = [i for i in order if model.cluster[i] == c and i != idx]
+    rest = [i for i in order if i != idx and i not in same]
+    return (same + rest)[:n]
+
+
+def timed(fn, queries):
+    samples = []
+    for q in queries:
+        t0 = time.perf_counter()
+        fn(int(q))
+        samples.append((time.perf_counter() - t0) * 1000)
+    return np.median(samples), np.percentile(samples, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Similar-games ranking latency on synthetic catalogs.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 500_000])
+    parser.add_argument("--n", type=int, default=12, help="games per lookup (game page shows 12)")
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--legacy-max", type=int, default=10_000,
+                        help="largest catalog to time the legacy O(N²) path on")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'games':>9} {'path':<24} {'median ms':>10} {'p95 ms':>10}")
+    for size in args.sizes:
+        queries = rng.integers(0, size, args.repeats)
+        for label, same in (("neighbour list", True), ("cluster scan (fallback)", False)):
+            model = synthetic_model(size, same_cluster_neighbors=same)
+            med, p95 = timed(lambda q: _similar_indices(model, q, args.n), queries)
+            print(f"{size:>9} {label:<24} {med:>10.3f} {p95:>10.3f}")
+
+        if size <= args.legacy_max:
+            sims = model.embeddings @ model.embeddings[0]
+            med, p95 = timed(lambda q: legacy_similar(model, sims, q, args.n), queries[:3])
+            print(f"{size:>9} {'legacy (full argsort)':<24} {med:>10.3f} {p95:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
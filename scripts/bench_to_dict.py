@@ -0,0 +1,56 @@
+# bench_to_dict.py
+# Game.to_dict throughput: legacy eval() of a double-encoded screenshots string
+# versus the native JSON array the column now holds. No database needed.
+#   python -m scripts.bench_to_dict [--games 20000] [--screenshots 6]
+import argparse
+import json
+import time
+from datetime import datetime
+
+from app.models import Game
+
+
+def legacy_to_dict(game):
+    data = game.to_dict()
+    data["screenshots"] = eval(str(game.screenshots))
+    return data
+
+
+def make_games(n, shots, encoded):
+    games = []
+    for i in range(n):
+        urls = [f"https://res.cloudinary.com/demo/image/upload/games/{i}/shot_{j}.jpg" for j in range(shots)]
+        games.append(Game(
+            id=i, name=f"Game {i}", slug=f"game-{i}", genres="Action, RPG", tags="Singleplayer",
+            released=datetime(2020, 1, 1).date(), metacritic=80, rating=4.2, playtime=12,
+            last_updated=datetime(2024, 1, 1), screenshots=json.dumps(urls) if encoded else urls,
+        ))
+    return games
+
+
+def bench(fn, games, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for game in games:
+            fn(game)
+        best = min(best, time.perf_counter() - t0)
+    return len(games) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Game.to_dict throughput before/after screenshots normalization.")
+    parser.add_argument("--games", type=int, default=20000)
+    parser.add_argument("--screenshots", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    before = bench(legacy_to_dict, make_games(args.games, args.screenshots, encoded=True), args.repeat)
+    after = bench(Game.to_dict, make_games(args.games, args.screenshots, encoded=False), args.repeat)
+    print(f"{args.games} games, {args.screenshots} screenshots each")
+    print(f"{'eval(str(...))':>16} {before:>12.0f} rows/s")
+    print(f"{'native JSON':>16} {after:>12.0f} rows/s  ({after / before:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,61 +1,145 @@
 # populate_colors.py
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from PIL import Image
-import requests
-from io import BytesIO
+"""
+Fill Game.accent_color with the average color of each game's background image.
+  python -m scripts.color [--download-workers 8] [--decode-workers N] [--chunk-size 200] [--verbose]
+
+Only games whose accent_color is missing are touched, a chunk at a time:
+a thread pool downloads the chunk's images, a process pool decodes them and
+averages the pixels with NumPy, and the chunk is committed before the next
+one starts, so an interrupted run resumes where it stopped.
+"""
+import argparse
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from io import BytesIO
+
+import numpy as np
+import requests
 from dotenv import load_dotenv
+from PIL import Image
+from sqlalchemy import bindparam, create_engine, or_, select
+from sqlalchemy.orm import sessionmaker
 
 load_dotenv()
 
 # Import your Game model
 from app.models import Game
+from scripts.ingest import get, make_session
 
-# Set up your database connection
-engine = create_engine(os.getenv('DATABASE_URL'))
-Session = sessionmaker(bind=engine)
-session = Session()
 
+def average_color(image_bytes):
+    """
+    Average color of an encoded image as "r, g, b", plus the decode time in
+    seconds; runs in the decode process pool.
+    """
+    started = time.perf_counter()
+    img = Image.open(BytesIO(image_bytes))
+    img.thumbnail((100, 100))
+    pixels = np.asarray(img.convert("RGB"), dtype=np.uint64).reshape(-1, 3)
+    r, g, b = pixels.sum(axis=0) // len(pixels)
+    return f"{r}, {g}, {b}", time.perf_counter() - started
+
+
+def _download(session, image_url):
+    started = time.perf_counter()
+    return get(session, image_url, retries=1).content, time.perf_counter() - started
+
+
+def pending_games(session, chunk_size):
+    """Chunks of (id, background_image) for games without an accent color, paged by id."""
+    missing = or_(Game.accent_color.is_(None), Game.accent_color == "")
+    query = (
+        select(Game.id, Game.background_image)
+        .where(missing, Game.background_image.isnot(None), Game.background_image != "")
+        .order_by(Game.id)
+        .limit(chunk_size)
+    )
+    last = None
+    while True:
+        chunk = session.execute(query if last is None else query.where(Game.id > last)).all()
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1][0]
+
+
+def _summary(name, seconds):
+    if not seconds:
+        return f"{name}: -"
+    ms = np.asarray(seconds) * 1000
+    return f"{name}: median {np.median(ms):.1f} ms, p95 {np.percentile(ms, 95):.1f} ms, total {ms.sum() / 1000:.1f} s"
+
+
+def update_game_colors(session, download_workers=8, decode_workers=None, chunk_size=200, verbose=False):
+    """Colors every game missing one; returns the number updated."""
+    table = Game.__table__
+    update = (
+        table.update()
+        .where(table.c.id == bindparam("gid"), or_(table.c.accent_color.is_(None), table.c.accent_color == ""))
+        .values(accent_color=bindparam("color"))
+    )
+    http = make_session(download_workers)
+    download_times, decode_times = [], []
+    updated = failed = 0
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=download_workers) as downloads, \
+            ProcessPoolExecutor(max_workers=decode_workers) as decoders:
+        for chunk in pending_games(session, chunk_size):
+            fetches = {downloads.submit(_download, http, url): (gid, url) for gid, url in chunk}
+            decodes = {}
+            for future in as_completed(fetches):
+                gid, url = fetches[future]
+                try:
+                    image_bytes, seconds = future.result()
+                except requests.RequestException as e:
+                    failed += 1
+                    print(f"Error downloading image at {url}: {e}")
+                    continue
+                download_times.append(seconds)
+                decodes[decoders.submit(average_color, image_bytes)] = (gid, url, seconds)
+
+            rows = []
+            for future in as_completed(decodes):
+                gid, url, download_seconds = decodes[future]
+                try:
+                    color, seconds = future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"Error processing image at {url}: {e}")
+                    continue
+                decode_times.append(seconds)
+                rows.append({"gid": gid, "color": color})
+                if verbose:
+                    print(f"Game {gid}: {color} (download {download_seconds * 1000:.0f} ms, "
+                          f"decode {seconds * 1000:.0f} ms)")
+
+            if rows:
+                session.execute(update, rows)
+            session.commit()
+            updated += len(rows)
+            print(f"Committed {len(rows)} colors ({updated} so far, {failed} failed)")
+
+    print(_summary("download", download_times))
+    print(_summary("decode", decode_times))
+    print(f"Updated {updated} game colors, {failed} failed, in {time.perf_counter() - started:.1f}s.")
+    return updated
 
-def get_dominant_color(image_url):
-    """Fetches an image from a URL and returns its average color."""
-    try:
-        response = requests.get(image_url)
-        response.raise_for_status()
-        img = Image.open(BytesIO(response.content))
-        img.thumbnail((100, 100))
-        img = img.convert("RGB")
-        colors = list(img.getdata())
-
-        r = sum(c[0] for c in colors)
-        g = sum(c[1] for c in colors)
-        b = sum(c[2] for c in colors)
-        count = len(colors)
-
-        return f"{r // count}, {g // count}, {b // count}"
-    except Exception as e:
-        print(f"Error processing image at {image_url}: {e}")
-        return None
 
+def main():
+    parser = argparse.ArgumentParser(description="Fill missing Game.accent_color values.")
+    parser.add_argument("--download-workers", type=int, default=8)
+    parser.add_argument("--decode-workers", type=int, default=None, help="decoding processes (default: CPUs)")
+    parser.add_argument("--chunk-size", type=int, default=200, help="games per commit")
+    parser.add_argument("--verbose", action="store_true", help="print every color with its timings")
+    args = parser.parse_args()
 
-def update_game_colors():
-    """Iterates through games and updates the color column."""
+    # Set up your database connection
+    engine = create_engine(os.getenv('DATABASE_URL'))
+    session = sessionmaker(bind=engine)()
     try:
-        # Query for all games
-        games = session.query(Game).all()
-
-        for game in games:
-            # Assume each game has a thumbnail_url column
-            if game.background_image:
-                color = get_dominant_color(game.background_image)
-                if color:
-                    game.accent_color = color
-                    print(f"Updated color for '{game.name}': {color}")
-
-        # Commit all changes to the database
-        session.commit()
-        print("Successfully updated all game colors.")
+        update_game_colors(session, args.download_workers, args.decode_workers, args.chunk_size, args.verbose)
     except Exception as e:
         session.rollback()
         print(f"An error occurred: {e}")
@@ -64,4 +148,4 @@ def update_game_colors():
 
 
 if __name__ == '__main__':
-    update_game_colors()
\ No newline at end of file
+    main()
@@ -1,100 +1,240 @@
+# data_collection.py
+"""
+Backfill game screenshots (and descriptions) from RAWG, re-hosted on Cloudinary.
+  python -m scripts.data_collection [--workers 4] [--upload-workers 8] [--rate 5]
+  python -m scripts.data_collection --uploader local --local-dir /tmp/shots    no Cloudinary account needed
+
+The screenshot backfill is a bounded pipeline:
+- A producer pages through the ids of games with no screenshots, by id.
+- Game workers fetch each game's screenshot list from RAWG under an adaptive
+  token bucket, which halves its rate on 429 and creeps back up.
+- Upload workers download every screenshot and re-host it.
+- The main thread appends each finished game to a checkpoint file and
+  commits in batches, emptying the checkpoint after every commit.
+The DB is the source of truth: games without screenshots are stored as [], so
+they are not asked for again, and a game with any failed screenshot is left
+NULL, so the next run retries it. A crash loses at most one uncommitted batch;
+the next run commits it from the checkpoint before touching the network.
+"""
+import argparse
+import json
 import os
 import time
-import requests
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from io import BytesIO
+
+import requests
 from dotenv import load_dotenv
+
 from app import create_app, db
 from app.models import Game  # your SQLAlchemy Game model
-import cloudinary.uploader
-import cloudinary
-import json
+from scripts.ingest import AdaptiveTokenBucket, get, make_session
 
 # Load environment variables
 load_dotenv()
 API_KEY = os.getenv("RAWG_API_KEY")
 
-CLOUDINARY_CLOUD_NAME = os.getenv("CLOUDINARY_CLOUD_NAME")
-CLOUDINARY_API_KEY = os.getenv("CLOUDINARY_API_KEY")
-CLOUDINARY_API_SECRET = os.getenv("CLOUDINARY_API_SECRET")
+BASE_URL = os.getenv("RAWG_BASE_URL", "https://api.rawg.io/api")
+# In the gitignored instance/ folder: durable across reboots, never committed.
+CHECKPOINT_PATH = os.getenv(
+    "SCREENSHOTS_CHECKPOINT",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "instance", "screenshots.checkpoint.jsonl"),
+)
 
 
+class CloudinaryUploader:
+    """Uploads to Cloudinary as WebP and returns the secure URL."""
 
-cloudinary.config(
-    cloud_name=CLOUDINARY_CLOUD_NAME,
-    api_key=CLOUDINARY_API_KEY,
-    api_secret=CLOUDINARY_API_SECRET,
-    secure=True
-)
+    def __init__(self):
+        import cloudinary
+        import cloudinary.uploader
 
-BASE_URL = "https://api.rawg.io/api"
+        cloudinary.config(
+            cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
+            api_key=os.getenv("CLOUDINARY_API_KEY"),
+            api_secret=os.getenv("CLOUDINARY_API_SECRET"),
+            secure=True
+        )
+        self._upload = cloudinary.uploader.upload
 
-app = create_app()
-app.app_context().push()
+    def upload(self, image_bytes: bytes, public_id: str) -> str:
+        result = self._upload(
+            BytesIO(image_bytes),
+            public_id=public_id,
+            overwrite=True,
+            resource_type="image",
+            format="webp"  # force WebP (can use 'avif' too if supported)
+        )
+        return result["secure_url"]
 
-def upload_to_cloudinary(image_url, game_id):
-    """Upload image to Cloudinary in WebP and return the secure URL"""
-    response = requests.get(image_url, timeout=10)
-    response.raise_for_status()
-    img_bytes = BytesIO(response.content)
 
-    result = cloudinary.uploader.upload(
-        img_bytes,
-        public_id=f"games/{game_id}/original",
-        overwrite=True,
-        resource_type="image",
-        format="webp"  # force WebP (can use 'avif' too if supported)
-    )
-    return result["secure_url"]
+class LocalUploader:
+    """Writes images under `root` and returns `base_url/<public_id>`; stands in for Cloudinary."""
 
-def fetch_and_update_game_screenshots():
-    games = Game.query.all()
-    for i, game in enumerate(games, 1):
-        print(f"[{i}] Processing {game.name}...")
+    def __init__(self, root: str, base_url: str | None = None):
+        self.root = root
+        self.base_url = base_url or "file://" + os.path.abspath(root)
+
+    def upload(self, image_bytes: bytes, public_id: str) -> str:
+        path = os.path.join(self.root, public_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(image_bytes)
+        return f"{self.base_url}/{public_id}"
 
-        # Skip if screenshots already exist
-        if game.screenshots:
-            print(" - Screenshots already exist, skipping.")
-            continue
 
-        # Fetch screenshots from RAWG
+class Checkpoint:
+    """
+    JSON lines of finished games not committed yet, {"id": ..., "screenshots": [...]},
+    written before the DB commit so a crash never loses uploaded screenshots,
+    and truncated once they are committed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: dict[int, list] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line of a crashed run
+                    self.done[entry["id"]] = entry["screenshots"]
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def record(self, game_id: int, screenshots: list):
+        self.done[game_id] = screenshots
+        self._file.write(json.dumps({"id": game_id, "screenshots": screenshots}) + "\n")
+        self._file.flush()
+
+    def truncate(self):
+        self.done.clear()
+        self._file.truncate(0)
+
+    def close(self):
+        self._file.close()
+
+
+def pending_game_ids(chunk_size=1000):
+    """Ids of games without screenshots, paged by id so commits during the walk are harmless."""
+    query = db.select(Game.id).where(Game.screenshots.is_(None)).order_by(Game.id).limit(chunk_size)
+    last = None
+    while True:
+        ids = db.session.scalars(query if last is None else query.where(Game.id > last)).all()
+        if not ids:
+            return
+        yield from ids
+        last = ids[-1]
+
+
+def _screenshot_urls(session, bucket, game_id):
+    response = get(session, f"{BASE_URL}/games/{game_id}/screenshots", bucket, params={"key": API_KEY})
+    return [s["image"] for s in response.json().get("results", [])]
+
+
+def _rehost(session, uploader, shot_url, public_id):
+    image = get(session, shot_url, retries=2).content
+    return uploader.upload(image, public_id)
+
+
+def _process_game(game_id, session, bucket, uploader, uploads: ThreadPoolExecutor):
+    """
+    Screenshot list of one game, re-hosted; uploads run on the upload pool.
+    Raises if any screenshot failed, so the game is neither checkpointed nor
+    committed and the next run retries it whole (uploads overwrite).
+    """
+    raw_screenshots = _screenshot_urls(session, bucket, game_id)
+    futures = [
+        uploads.submit(_rehost, session, uploader, shot_url, f"games/{game_id}/screenshot_{idx}")
+        for idx, shot_url in enumerate(raw_screenshots, 1)
+    ]
+    cloud_screenshots, errors = [], []
+    for future in futures:
         try:
-            url = f"{BASE_URL}/games/{game.id}/screenshots"
-            response = requests.get(url, params={"key": API_KEY}, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            raw_screenshots = [s["image"] for s in data.get("results", [])]
+            cloud_screenshots.append(future.result())
         except Exception as e:
-            print(f" - Failed to fetch screenshots for {game.name}: {e}")
-            continue
+            errors.append(e)
+    if errors:
+        raise RuntimeError(f"{len(errors)} of {len(futures)} screenshots failed: {errors[0]}") from errors[0]
+    return cloud_screenshots
 
-        if not raw_screenshots:
-            print(" - No screenshots found.")
-            continue
 
-        # Upload screenshots to Cloudinary
-        cloud_screenshots = []
-        for idx, shot_url in enumerate(raw_screenshots, 1):
-            public_id = f"games/{game.id}/screenshot_{idx}"
-            uploaded_url = upload_to_cloudinary(shot_url, public_id)
-            if uploaded_url:
-                cloud_screenshots.append(uploaded_url)
-            time.sleep(0.2)  # avoid spamming RAWG or Cloudinary
-
-        # Update game record
-        if cloud_screenshots:
-            game.screenshots = json.dumps(cloud_screenshots)  # or use JSON type if Postgres
-            db.session.commit()
-            print(f" - Uploaded {len(cloud_screenshots)} screenshots for {game.name}")
-
-        time.sleep(0.4)
-
-def update_game_descriptions_and_images():
-    games = Game.query.all()
-    for i, game in enumerate(games, 1):
-        # Skip if already has description and image_url
-        if game.description:
-            continue
+def _commit(batch):
+    if not batch:
+        return
+    table = Game.__table__
+    db.session.execute(
+        table.update().where(table.c.id == db.bindparam("gid")).values(screenshots=db.bindparam("shots")),
+        batch,
+    )
+    db.session.commit()
+    batch.clear()
 
+
+def fetch_and_update_game_screenshots(uploader=None, workers=4, upload_workers=8, rate=5.0,
+                                      commit_every=50, checkpoint_path=CHECKPOINT_PATH):
+    uploader = uploader or CloudinaryUploader()
+    checkpoint = Checkpoint(checkpoint_path)
+    session = make_session(workers + upload_workers)
+    bucket = AdaptiveTokenBucket(rate, min_rate=0.2, burst=workers)
+    batch, in_flight = [], {}
+    stats = {"uploaded": 0, "empty": 0, "failed": 0, "resumed": 0}
+    started = time.perf_counter()
+
+    def commit():
+        _commit(batch)
+        checkpoint.truncate()
+
+    def finish(game_id, screenshots):
+        batch.append({"gid": game_id, "shots": screenshots})  # [] too, so the game is not asked for again
+        stats["uploaded" if screenshots else "empty"] += 1
+        if len(batch) >= commit_every:
+            commit()
+
+    def drain():
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            game_id = in_flight.pop(future)
+            try:
+                screenshots = future.result()
+            except Exception as e:
+                stats["failed"] += 1  # not checkpointed: retried on the next run
+                print(f" - Failed game {game_id}: {e}")
+                continue
+            checkpoint.record(game_id, screenshots)
+            finish(game_id, screenshots)
+
+    try:
+        # the batch an earlier run uploaded but did not commit
+        stats["resumed"] = len(checkpoint.done)
+        batch.extend({"gid": game_id, "shots": shots} for game_id, shots in checkpoint.done.items())
+        commit()
+
+        with ThreadPoolExecutor(max_workers=workers) as games, \
+                ThreadPoolExecutor(max_workers=upload_workers) as uploads:
+            for game_id in pending_game_ids():
+                if len(in_flight) >= 2 * workers:
+                    drain()  # bounded: at most two games queued per worker
+                in_flight[games.submit(_process_game, game_id, session, bucket, uploader, uploads)] = game_id
+            while in_flight:
+                drain()
+        commit()
+    finally:
+        checkpoint.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Screenshots: {stats['uploaded']} games updated ({stats['resumed']} more from the checkpoint), "
+          f"{stats['empty']} without screenshots, {stats['failed']} failed, {elapsed:.1f}s, "
+          f"RAWG rate {bucket.rate:.1f}/s")
+    return stats
+
+
+def update_game_descriptions_and_images(uploader=None):
+    uploader = uploader or CloudinaryUploader()
+    games = Game.query.filter(Game.description.is_(None) | (Game.description == "")).all()
+    for i, game in enumerate(games, 1):
         # Fetch description from RAWG
         try:
             url = f"{BASE_URL}/games/{game.slug}"
@@ -110,7 +250,7 @@ def update_game_descriptions_and_images():
         image_url = None
         if data.get("background_image"):
             try:
-                image_url = upload_to_cloudinary(data["background_image"], game.id)
+                image_url = _rehost(requests, uploader, data["background_image"], f"games/{game.id}/original")
             except Exception as e:
                 print(f"[{i}] Failed to upload image for {game.slug}: {e}")
 
@@ -125,20 +265,29 @@ def update_game_descriptions_and_images():
         # Avoid hitting RAWG rate limit
         time.sleep(0.5)
 
-if __name__ == "__main__":
-    # update_game_descriptions_and_images()
-    # game_id = 39707 # example game ID
-    #
-    # url = f"https://api.rawg.io/api/games/{game_id}/screenshots"
-    # response = requests.get(url, params={"key": API_KEY})
-    # data = response.json()
-    #
-    # print(data)
-    #
-    # # Each screenshot object has 'id', 'image' (URL)
-    # for shot in data["results"]:
-    #     print(shot["image"])
-
-    fetch_and_update_game_screenshots()
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill game screenshots from RAWG.")
+    parser.add_argument("--workers", type=int, default=4, help="games fetched from RAWG concurrently")
+    parser.add_argument("--upload-workers", type=int, default=8, help="concurrent screenshot downloads/uploads")
+    parser.add_argument("--rate", type=float, default=5.0, help="max RAWG requests per second")
+    parser.add_argument("--commit-every", type=int, default=50, help="games per DB commit")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+    parser.add_argument("--uploader", choices=("cloudinary", "local"), default="cloudinary")
+    parser.add_argument("--local-dir", default="screenshots", help="target of --uploader local")
+    parser.add_argument("--descriptions", action="store_true", help="backfill descriptions and images instead")
+    args = parser.parse_args()
+
+    uploader = LocalUploader(args.local_dir) if args.uploader == "local" else CloudinaryUploader()
+    with create_app(require_model=False).app_context():
+        if args.descriptions:
+            update_game_descriptions_and_images(uploader)
+        else:
+            fetch_and_update_game_screenshots(uploader, args.workers, args.upload_workers, args.rate,
+                                              args.commit_every, args.checkpoint)
 
     print("✅ All done!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# ingest.py
+"""
+Shared pieces of the data ingestion scripts (seed_games, data_collection,
+color, migrate_games): token-bucket rate limiters, fixed or adapting to 429s,
+pooled HTTP sessions with timeouts and retries, and dialect-aware bulk
+INSERT ... ON CONFLICT.
+"""
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from sqlalchemy.dialects import postgresql, sqlite
+
+DEFAULT_TIMEOUT = 10  # seconds, connect + read
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Allow `rate` acquisitions per second with bursts of up to `burst`;
+    thread-safe, so one bucket paces every worker sharing an API key.
+    """
+
+    def __init__(self, rate: float, burst: int | None = None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1, int(rate)))
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def succeeded(self):
+        """Hook for a request that went through; the fixed-rate bucket ignores it."""
+
+    def throttled(self):
+        """Hook for a 429 response; the fixed-rate bucket ignores it."""
+
+
+class AdaptiveTokenBucket(TokenBucket):
+    """
+    TokenBucket that halves its rate on every 429 and creeps back up by
+    `step` per successful request (AIMD), between `min_rate` and `max_rate`,
+    instead of sleeping a fixed interval after each request.
+    """
+
+    def __init__(self, max_rate: float, min_rate: float = 0.5, step: float = 0.1, burst: int | None = None):
+        super().__init__(max_rate, burst)
+        self.max_rate = float(max_rate)
+        self.min_rate = float(min_rate)
+        self.step = step
+
+    def succeeded(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.step)
+
+    def throttled(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)  # drop the burst allowance too
+
+
+def make_session(pool_size: int = 10) -> requests.Session:
+    """requests.Session whose connection pool is large enough for `pool_size` threads."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get(session, url, bucket: TokenBucket | None = None, retries: int = 3, timeout=DEFAULT_TIMEOUT, **kwargs):
+    """
+    GET under the rate limit; 429, 5xx, connection errors and timeouts are
+    retried with exponential backoff (or the server's Retry-After). Raises
+    requests.HTTPError (or the connection error) once retries run out.
+    """
+    for attempt in range(retries + 1):
+        if bucket is not None:
+            bucket.acquire()
+        try:
+            resp = session.get(url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == retries:
+                raise
+            time.sleep(0.5 * 2 ** attempt)
+            continue
+        if bucket is not None and resp.status_code == 429:
+            bucket.throttled()
+        elif bucket is not None:
+            bucket.succeeded()
+        if resp.status_code not in RETRY_STATUSES or attempt == retries:
+            resp.raise_for_status()
+            return resp
+        time.sleep(_retry_after(resp) or 0.5 * 2 ** attempt)
+
+
+def _retry_after(resp) -> float | None:
+    try:
+        return float(resp.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def dialect_insert(bind, table):
+    """`insert(table)` of the bind's dialect, which has on_conflict_do_nothing/do_update."""
+    name = bind.dialect.name
+    if name == "postgresql":
+        return postgresql.insert(table)
+    if name == "sqlite":
+        return sqlite.insert(table)
+    raise NotImplementedError(f"no ON CONFLICT insert for {name}")
+
+
+def chunks(items, size):
+    """Consecutive lists of at most `size` items."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
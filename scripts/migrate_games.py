@@ -1,51 +1,116 @@
-import pandas as pd
+# migrate_games.py
+"""
+Load app/data/games.csv (and game_details.csv, when present) into the Game table.
+  python -m scripts.migrate_games [--chunk-size 5000]
+
+Both CSVs are read in chunks, so memory stays bounded by --chunk-size:
+1. games.csv rows are upserted by id: one INSERT ... ON CONFLICT (id) DO UPDATE
+   per chunk (PostgreSQL and SQLite).
+2. game_details.csv rows then update the games with the same slug; a detail
+   value wins over the games.csv one unless it is missing, like the
+   combine_first merge this replaces. On PostgreSQL that is one
+   UPDATE ... FROM (VALUES ...) per chunk, elsewhere an executemany.
+A key repeated within a chunk keeps its last row.
+Columns are converted per chunk with pandas (dates parsed, NaN -> NULL), and
+rows/second is reported for each pass.
+"""
+import argparse
+import os
+import time
 from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import bindparam, cast, column, func, values
+
 from app import create_app, db
 from app.models import Game
-import os
+from scripts.ingest import dialect_insert
 
-app = create_app()
+app = create_app(require_model=False)
 BASE_PATH = os.path.dirname(os.path.abspath(__file__))
 DETAILS_PATH = os.path.join(BASE_PATH, "..", "app", "data", "game_details.csv")
 GAMES_PATH = os.path.join(BASE_PATH, "..", "app", "data", "games.csv")
 
-def migrate_games():
+# Game columns the CSVs fill in; id and slug are the keys.
+FIELDS = ("name", "description", "released", "rating", "metacritic", "genres", "tags", "background_image")
+
+
+def _records(chunk: pd.DataFrame, keys) -> list[dict]:
+    """
+    Column-wise conversion of a CSV chunk into Game row dicts (missing values -> None).
+    A key repeated within the chunk keeps its last row, as the row-by-row load
+    did: PostgreSQL refuses to touch one row twice in a statement.
+    """
+    columns = [c for c in (*keys, *FIELDS) if c in chunk.columns]
+    df = chunk[columns].drop_duplicates(keys[0], keep="last")
+    if "released" in df:
+        df["released"] = pd.to_datetime(df["released"], format="%Y-%m-%d", errors="coerce").dt.date
+    for col in ("id", "metacritic"):
+        if col in df:
+            df[col] = df[col].astype("Int64")  # integral floats from NaN-holding columns
+    df = df.astype(object).where(df.notna(), None)
+    return df.to_dict("records")
+
+
+def upsert_games(rows: list[dict]):
+    table = Game.__table__
+    stmt = dialect_insert(db.session.get_bind(), table)
+    columns = [c for c in FIELDS if c in rows[0]]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_={**{c: stmt.excluded[c] for c in columns}, "slug": stmt.excluded.slug, "last_updated": datetime.now()},
+    )
+    db.session.execute(stmt, [{**row, "last_updated": datetime.now()} for row in rows])
+
+
+def update_details(rows: list[dict]):
+    table = Game.__table__
+    columns = [c for c in FIELDS if c in rows[0]]
+    if db.session.get_bind().dialect.name == "postgresql":
+        # one UPDATE ... FROM (VALUES ...) per chunk; psycopg2 would run an
+        # executemany UPDATE as one round trip per row
+        details = values(
+            column("slug", table.c.slug.type), *(column(c, table.c[c].type) for c in columns), name="details"
+        ).data([tuple(row.get(c) for c in ("slug", *columns)) for row in rows])
+        db.session.execute(
+            table.update()
+            .where(table.c.slug == details.c.slug)
+            # an all-NULL VALUES column comes back as text, so cast back to the Game column type
+            .values({c: func.coalesce(cast(details.c[c], table.c[c].type), table.c[c]) for c in columns})
+        )
+        return
+    stmt = (
+        table.update()
+        .where(table.c.slug == bindparam("b_slug"))
+        # details win unless missing (the old combine_first merge)
+        .values({c: func.coalesce(bindparam(f"b_{c}", type_=table.c[c].type), table.c[c]) for c in columns})
+    )
+    db.session.execute(stmt, [{f"b_{k}": v for k, v in row.items()} for row in rows])
+
+
+def _load(path, keys, write, chunk_size):
+    started, total = time.perf_counter(), 0
+    for chunk in pd.read_csv(path, chunksize=chunk_size):
+        rows = _records(chunk, keys)
+        if rows:
+            write(rows)
+            db.session.commit()
+        total += len(rows)
+    elapsed = time.perf_counter() - started
+    print(f"{os.path.basename(path)}: {total} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/s)")
+
+
+def migrate_games(chunk_size=5000):
     with app.app_context():
-        # Load CSVs
-        games_df = pd.read_csv(GAMES_PATH)
-        details_df = pd.read_csv(DETAILS_PATH)
-
-        # Merge on slug or id
-        df = pd.merge(games_df, details_df, on="slug", how="left")
-        for col in games_df.columns:
-            if col in details_df.columns and col != "slug":
-                df[col] = df[f"{col}_y"].combine_first(df[f"{col}_x"])
-                df.drop([f"{col}_x", f"{col}_y"], axis=1, inplace=True)
-
-        for _, row in df.iterrows():
-            # Check if game already exists
-            game = Game.query.filter_by(id=row["id"]).first()
-            if not game:
-                game = Game(id=row["id"], slug=row["slug"])
-
-            # Update fields
-            game.name = row.get("name")
-            game.description = row.get("description")
-            game.released = (
-                datetime.strptime(row["released"], "%Y-%m-%d").date()
-                if pd.notna(row.get("released"))
-                else None
-            )
-            game.rating = row.get("rating") if pd.notna(row.get("rating")) else None
-            game.metacritic = row.get("metacritic") if pd.notna(row.get("metacritic")) else None
-            game.genres = row.get("genres")
-            game.tags = row.get("tags")
-            game.background_image = row.get("background_image")
-
-            db.session.add(game)
-
-        db.session.commit()
+        _load(GAMES_PATH, ("id", "slug"), upsert_games, chunk_size)
+        if os.path.exists(DETAILS_PATH):
+            _load(DETAILS_PATH, ("slug",), update_details, chunk_size)
+        else:
+            print(f"No {os.path.basename(DETAILS_PATH)}, skipping details.")
         print("✅ Migration complete!")
 
+
 if __name__ == "__main__":
-    migrate_games()
+    parser = argparse.ArgumentParser(description="Upsert the games CSVs into the Game table.")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="CSV rows per chunk and commit")
+    migrate_games(parser.parse_args().chunk_size)
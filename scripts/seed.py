@@ -5,7 +5,7 @@ from scripts.seed_games import seed_games
 import os
 
 def seed():
-    app = create_app()
+    app = create_app(require_model=False)
     with app.app_context():
         db.create_all()
 
@@ -1,84 +1,200 @@
+# seed_games.py
+"""
+Seed the Game table from the RAWG API.
+  python -m scripts.seed_games [--max-games 1000] [--workers 4] [--rate 5]
+  RAWG_GAMES_URL=http://127.0.0.1:8000/games python -m scripts.seed_games    against a local stub
+
+Result pages are fetched concurrently under one token bucket, deduplicated
+against a single SELECT of the existing slugs, and written in batches with
+INSERT ... ON CONFLICT DO NOTHING. Background images are downloaded by a
+thread pool and ColorThief (pure Python, CPU-bound) runs in a process pool.
+"""
+import argparse
+import itertools
+import math
 import os
-import requests
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
-from app import db
-from app.models import Game
-from PIL import Image
-import requests as req
 from io import BytesIO
+
+import requests
 from colorthief import ColorThief
 
+from app import db
+from app.models import Game
+from scripts.ingest import TokenBucket, dialect_insert, get, make_session
+
 # Get RAWG API key
 RAWG_API_KEY = os.getenv("RAWG_API_KEY")  # set in .env / Render dashboard
-BASE_URL = "https://api.rawg.io/api/games"
+BASE_URL = os.getenv("RAWG_GAMES_URL", "https://api.rawg.io/api/games")
+
 
-def extract_accent_color(image_url):
-    """Extract dominant RGB color from an image."""
+def accent_color(image_bytes):
+    """Dominant RGB color of an encoded image as "r,g,b"; runs in the color process pool."""
     try:
-        response = req.get(image_url, timeout=10)
-        if response.status_code != 200:
-            return None
-        img = BytesIO(response.content)
-        color_thief = ColorThief(img)
-        dominant_color = color_thief.get_color(quality=1)
+        dominant_color = ColorThief(BytesIO(image_bytes)).get_color(quality=1)
         return ",".join(map(str, dominant_color))  # store as "r,g,b"
     except Exception as e:
-        print(f"Accent color failed for {image_url}: {e}")
+        print(f"Accent color failed: {e}")
         return None
 
-def fetch_games(page_size=40, max_games=1000):
-    """Fetch games from RAWG API in pages."""
-    page = 1
-    total_fetched = 0
-    while total_fetched < max_games:
-        params = {
-            "key": RAWG_API_KEY,
-            "page_size": page_size,
-            "page": page,
-        }
-        resp = requests.get(BASE_URL, params=params)
-        data = resp.json()
-        results = data.get("results", [])
-        if not results:
-            break
-
-        for game in results:
-            yield game
-            total_fetched += 1
-            if total_fetched >= max_games:
+
+def _download(session, image_url):
+    try:
+        return get(session, image_url, retries=1).content
+    except requests.RequestException as e:
+        print(f"Image download failed for {image_url}: {e}")
+        return None
+
+
+def _fetch_page(session, bucket, base_url, page, page_size):
+    """Results of one page; None when it failed, [] past the last page."""
+    params = {"key": RAWG_API_KEY, "page_size": page_size, "page": page}
+    try:
+        return get(session, base_url, bucket, params=params).json().get("results", [])
+    except requests.HTTPError as e:
+        if e.response is not None and e.response.status_code == 404:
+            return []  # RAWG answers 404 for pages past the end
+        print(f"Page {page} failed: {e}")
+    except requests.RequestException as e:
+        print(f"Page {page} failed: {e}")
+    return None
+
+
+def fetch_games(page_size=40, max_games=1000, workers=4, rate=5.0, base_url=BASE_URL, session=None):
+    """
+    Yield up to `max_games` RAWG games. Page 1 gives the total count; the
+    remaining pages are then fetched by `workers` threads sharing a bucket of
+    `rate` requests/second, and yielded in page order. At most 2 x `workers`
+    pages are in flight; the rest are only requested while results are still
+    wanted, and pages not yet started are cancelled once the last one is seen.
+    """
+    session = session or make_session(workers)
+    bucket = TokenBucket(rate, burst=workers)
+    params = {"key": RAWG_API_KEY, "page_size": page_size, "page": 1}
+    first = get(session, base_url, bucket, params=params).json()
+    total = min(max_games, first.get("count") or max_games)
+    remaining = total
+    pages = iter(range(2, math.ceil(total / page_size) + 1))
+    pool = ThreadPoolExecutor(max_workers=workers)
+    in_flight = deque()
+
+    def submit(n):
+        for page in itertools.islice(pages, n):
+            in_flight.append(pool.submit(_fetch_page, session, bucket, base_url, page, page_size))
+
+    def page_results():
+        yield first.get("results", [])
+        submit(2 * workers)
+        while in_flight:
+            results = in_flight.popleft().result()
+            submit(1)
+            yield results
+
+    try:
+        for results in page_results():
+            if results is None:
+                continue
+            if not results:
                 return
-        page += 1
+            for game in results[:remaining]:
+                yield game
+            remaining -= min(len(results), remaining)
+            if not remaining:
+                return
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
 
-def seed_games():
+def game_row(rawg_game):
+    """Game column values of one RAWG result."""
+    return {
+        "id": rawg_game["id"],
+        "slug": rawg_game["slug"],
+        "name": rawg_game["name"],
+        "description": rawg_game.get("description", ""),
+        "released": datetime.strptime(rawg_game["released"], "%Y-%m-%d").date() if rawg_game.get("released") else None,
+        "rating": rawg_game.get("rating"),
+        "metacritic": rawg_game.get("metacritic"),
+        "genres": ",".join([g["name"] for g in rawg_game.get("genres") or []]),
+        "tags": ",".join([t["name"] for t in rawg_game.get("tags") or []]),
+        "background_image": rawg_game.get("background_image"),
+        "playtime": rawg_game.get("playtime"),
+        "accent_color": None,
+        "last_updated": datetime.now(),
+    }
+
+
+def add_accent_colors(rows, session, downloads: ThreadPoolExecutor, colors: ProcessPoolExecutor):
+    """Fill row["accent_color"] in place: images download in `downloads`, decode in `colors`."""
+    with_image = [row for row in rows if row["background_image"]]
+    images = downloads.map(lambda row: _download(session, row["background_image"]), with_image)
+    pending = [(row, colors.submit(accent_color, data)) for row, data in zip(with_image, images) if data]
+    for row, future in pending:
+        row["accent_color"] = future.result()
+
+
+def insert_games(rows):
+    """One multi-row INSERT; rows whose id or slug already exists are skipped."""
+    stmt = dialect_insert(db.session.get_bind(), Game.__table__).on_conflict_do_nothing()
+    db.session.execute(stmt, rows)
+    db.session.commit()
+
+
+def seed_games(max_games=1000, page_size=40, workers=4, rate=5.0, color_workers=None,
+               batch_size=200, base_url=BASE_URL, colors=True):
     count_before = Game.query.count()
     print(f"Games in DB before: {count_before}")
+    started = time.perf_counter()
 
-    for rawg_game in fetch_games(max_games=1000):
-        if Game.query.filter_by(slug=rawg_game["slug"]).first():
-            continue  # skip duplicates
-
-        accent_color = extract_accent_color(rawg_game.get("background_image")) if rawg_game.get("background_image") else None
-
-        game = Game(
-            id=rawg_game["id"],
-            slug=rawg_game["slug"],
-            name=rawg_game["name"],
-            description=rawg_game.get("description", ""),
-            released=datetime.strptime(rawg_game["released"], "%Y-%m-%d").date() if rawg_game.get("released") else None,
-            rating=rawg_game.get("rating"),
-            metacritic=rawg_game.get("metacritic"),
-            genres=",".join([g["name"] for g in rawg_game.get("genres", [])]),
-            tags=",".join([t["name"] for t in rawg_game.get("tags", [])]),
-            background_image=rawg_game.get("background_image"),
-            playtime=rawg_game.get("playtime"),
-            accent_color=accent_color,
-            last_updated=datetime.now(),
-        )
-        db.session.add(game)
+    known = set(db.session.scalars(db.select(Game.slug)))
+    session = make_session(2 * workers)
+    rows, skipped = [], 0
+
+    with ThreadPoolExecutor(max_workers=workers) as downloads, \
+            ProcessPoolExecutor(max_workers=color_workers) as color_pool:
+        def flush():
+            if colors:
+                add_accent_colors(rows, session, downloads, color_pool)
+            if rows:
+                insert_games(rows)
+            rows.clear()
+
+        for rawg_game in fetch_games(page_size, max_games, workers, rate, base_url, session):
+            if rawg_game["slug"] in known:
+                skipped += 1
+                continue  # skip duplicates
+            known.add(rawg_game["slug"])
+            rows.append(game_row(rawg_game))
+            if len(rows) >= batch_size:
+                flush()
+        flush()
 
-    db.session.commit()
     count_after = Game.query.count()
-    print(f"Games in DB after: {count_after}")
+    elapsed = time.perf_counter() - started
+    print(f"Games in DB after: {count_after} "
+          f"(+{count_after - count_before}, {skipped} duplicates skipped, {elapsed:.1f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the Game table from the RAWG API.")
+    parser.add_argument("--max-games", type=int, default=1000)
+    parser.add_argument("--page-size", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=4, help="concurrent page and image downloads")
+    parser.add_argument("--rate", type=float, default=5.0, help="RAWG requests per second")
+    parser.add_argument("--color-workers", type=int, default=None, help="ColorThief processes (default: CPUs)")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--no-colors", action="store_true", help="skip accent color extraction")
+    args = parser.parse_args()
+
+    from app import create_app
+    with create_app(require_model=False).app_context():
+        seed_games(args.max_games, args.page_size, args.workers, args.rate, args.color_workers,
+                   args.batch_size, args.base_url, colors=not args.no_colors)
+
 
 if __name__ == "__main__":
-    seed_games()
+    main()
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from app.recommender import recommender
+from app.recommender.artifact import save_model
+from app.recommender.batch import UserProfile, batch_recommend, batch_scores
+from app.recommender.ml import build_neighbor_index
+from app.recommender.recommender import PROFILE_WINDOW, _hybrid_rank, _index_of, get_model
+
+N_GAMES = 600
+
+
+@pytest.fixture(scope="module", autouse=True)
+def model(tmp_path_factory):
+    """Small random model in a temp dir, served by get_model instead of MODEL_DIR."""
+    rng = np.random.default_rng(1)
+    ids = rng.permutation(np.arange(1000, 1000 + 3 * N_GAMES))[:N_GAMES].astype(np.int64)
+    embeddings = rng.normal(size=(N_GAMES, 16)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    neighbor_idx, neighbor_scores = build_neighbor_index(embeddings, k=20)
+    rating = rng.uniform(0, 5, N_GAMES).astype(np.float32)
+    metacritic = rng.uniform(40, 100, N_GAMES).astype(np.float32)
+    metacritic[rng.random(N_GAMES) < 0.2] = np.nan
+    path = str(tmp_path_factory.mktemp("model"))
+    save_model({
+        "ids": ids,
+        "id_order": np.argsort(ids, kind="stable"),
+        "cluster": rng.integers(0, 8, N_GAMES).astype(np.int32),
+        "franchise": rng.integers(0, 120, N_GAMES).astype(np.int32),
+        "rating": rating,
+        "metacritic": metacritic,
+        "embeddings": embeddings,
+        "neighbor_idx": neighbor_idx,
+        "neighbor_scores": neighbor_scores,
+    }, path=path)
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(recommender, "MODEL_DIR", path)
+        recommender.reload_model()
+        yield get_model()
+    recommender.reload_model()
+
+
+@pytest.fixture(scope="module")
+def profiles(model):
+    ids = np.asarray(model.ids)
+    rng = np.random.default_rng(0)
+    out = []
+    for clicks in [20] * 10 + [PROFILE_WINDOW + 30] * 10:  # longer histories hit the click window
+        clicked = rng.choice(ids, clicks).tolist()
+        # played among the latest clicks, so damped games compete for the top of the ranking
+        played = rng.choice(clicked[-10:], 5, replace=False).tolist()
+        rated = rng.choice(ids, 5)
+        out.append(UserProfile(clicked, played, {str(g): int(r) for g, r in zip(rated, rng.integers(1, 6, 5))}))
+    return out
+
+
+@pytest.mark.parametrize("diversify", [False, True])
+def test_batch_recommend_matches_hybrid_recommend(model, profiles, diversify):
+    scores = batch_scores(profiles)
+    batched = batch_recommend(profiles, n=20, diversify=diversify)
+    for profile, row_scores, got in zip(profiles, scores, batched):
+        want = _hybrid_rank(profile.clicked, profile.played, profile.ratings, n=20, diversify=diversify)
+        if got != model.ids[want].tolist():
+            # equal scores may come out in either order, nothing else may differ
+            np.testing.assert_allclose(row_scores[_index_of(got)], row_scores[want], rtol=1e-5, atol=1e-6)
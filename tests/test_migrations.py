@@ -0,0 +1,47 @@
+import importlib.util
+import json
+from pathlib import Path
+
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+VERSIONS = Path(__file__).resolve().parent.parent / "migrations" / "versions"
+
+
+def _revision(name):
+    spec = importlib.util.spec_from_file_location(name, VERSIONS / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_normalize_game_screenshots():
+    migration = _revision("7c4e2a9d1f35_normalize_game_screenshots")
+    urls = ["https://img/a.jpg", "https://img/b.jpg"]
+    rows = {
+        1: json.dumps(json.dumps(urls)),  # double-encoded JSON string
+        2: json.dumps(str(urls)),         # Python repr of a list
+        3: json.dumps(urls),              # already an array
+        4: json.dumps("https://img/bare.jpg"),  # bare URL, neither JSON nor a literal
+        5: json.dumps("not [a literal"),
+        6: json.dumps("  "),
+        7: None,
+    }
+    engine = sa.create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(sa.text("CREATE TABLE game (id INTEGER PRIMARY KEY, screenshots JSON)"))
+        conn.execute(sa.text("INSERT INTO game VALUES (:id, :shots)"),
+                     [{"id": gid, "shots": shots} for gid, shots in rows.items()])
+        with Operations.context(MigrationContext.configure(conn)):
+            migration.upgrade()
+        result = dict(conn.execute(sa.text("SELECT id, screenshots FROM game")).all())
+
+    decoded = {gid: None if value is None else json.loads(value) for gid, value in result.items()}
+    assert decoded == {
+        1: urls, 2: urls, 3: urls,
+        4: ["https://img/bare.jpg"],
+        5: ["not [a literal"],
+        6: None,
+        7: None,
+    }